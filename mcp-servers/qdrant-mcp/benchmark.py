@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Multi-tenant retrieval benchmark for the Qdrant MCP tools
+
+Generates synthetic businesses with a skewed (Zipf) number of chunks each,
+embeds them with deterministic md5-seeded vectors (the simulate_embedding
+approach, via embedders.HashEmbedder) and drives the server's tools directly:
+upsert_points, search_points, scroll_points and delete_points. Results
+(p50/p95/p99 latency, throughput, peak RSS) are printed as JSON.
+
+Server settings come from the usual QDRANT_* environment variables, so
+configurations are compared by running the benchmark twice with different
+environments, e.g.:
+
+    python benchmark.py --output base.json
+    QDRANT_TENANT_REPLICA=true python benchmark.py --baseline base.json
+
+Backends:
+- memory: qdrant_client's in-process AsyncQdrantClient(":memory:")
+- numpy:  the in-process NumPy vector store (numpy_backend.py)
+- qdrant: a real cluster from QDRANT_URL / QDRANT_CONFIG_FILE
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import numpy as np
+
+# The benchmark's corpus is hash-embedded; keep any server-side embedding consistent
+os.environ.setdefault("EMBEDDER_BACKEND", "hash")
+
+import server
+from client_factory import create_async_client, load_client_config
+from embedders import HashEmbedder
+from ingest import point_id
+from numpy_backend import NumpyVectorStore
+from qdrant_client import AsyncQdrantClient
+
+BACKENDS = ("memory", "numpy", "qdrant")
+
+def tenant_sizes(businesses: int, mean_chunks: int, skew: float) -> list[int]:
+    """Chunks per business, Zipf-distributed with exponent skew (0 = uniform)"""
+    weights = 1.0 / np.arange(1, businesses + 1) ** skew
+    weights /= weights.sum()
+    return [max(1, int(round(w * businesses * mean_chunks))) for w in weights]
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class Dataset:
+    """Deterministic synthetic tenants: ids, texts, vectors and payloads"""
+
+    def __init__(self, businesses: int, mean_chunks: int, dimension: int, skew: float, chunks_per_doc: int = 10):
+        self.embedder = HashEmbedder(dimension)
+        self.sizes = tenant_sizes(businesses, mean_chunks, skew)
+        self.business_ids = [f"bench-business-{i:04d}" for i in range(businesses)]
+        self.chunks_per_doc = chunks_per_doc
+
+    def text(self, business_id: str, chunk_index: int) -> str:
+        return f"{business_id} knowledge chunk {chunk_index}"
+
+    def source(self, chunk_index: int) -> str:
+        return f"doc-{chunk_index // self.chunks_per_doc}"
+
+    def point_id(self, business_id: str, chunk_index: int) -> str:
+        return point_id("chunk_index", business_id, self.source(chunk_index), chunk_index)
+
+    def vector(self, business_id: str, chunk_index: int) -> np.ndarray:
+        return self.embedder.embed_one(self.text(business_id, chunk_index))
+
+    def points(self, business_id: str, start: int, stop: int) -> list[dict[str, Any]]:
+        return [
+            {
+                "id": self.point_id(business_id, i),
+                "vector": self.vector(business_id, i).tolist(),
+                "payload": {
+                    "business_id": business_id,
+                    "tenant_id": "business",
+                    "content_type": "knowledge",
+                    "text": self.text(business_id, i),
+                    "source": self.source(i),
+                    "chunk_index": i
+                }
+            }
+            for i in range(start, stop)
+        ]
+
+class Recorder:
+    """Latencies and outcomes of one benchmark operation"""
+
+    def __init__(self):
+        self.latencies_ms: list[float] = []
+        self.errors = 0
+        self.items = 0
+        self.wall_s = 0.0
+
+    def summary(self) -> dict[str, Any]:
+        if not self.latencies_ms:
+            return {"calls": 0, "errors": self.errors}
+        latencies = np.array(self.latencies_ms)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            "calls": len(latencies),
+            "errors": self.errors,
+            "items": self.items,
+            "mean_ms": round(float(latencies.mean()), 3),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(latencies.max()), 3),
+            "calls_per_s": round(len(latencies) / self.wall_s, 1) if self.wall_s else None,
+            "items_per_s": round(self.items / self.wall_s, 1) if self.wall_s else None
+        }
+
+async def run_phase(
+    calls: list[Callable[[], Awaitable[dict[str, Any]]]],
+    concurrency: int,
+    count_key: Optional[str] = None
+) -> Recorder:
+    """Run tool calls with bounded concurrency, timing each one"""
+    recorder = Recorder()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def timed(call: Callable[[], Awaitable[dict[str, Any]]]) -> None:
+        async with slots:
+            started = time.perf_counter()
+            result = await call()
+            recorder.latencies_ms.append((time.perf_counter() - started) * 1000)
+        if not result.get("success", True) or "error" in result:
+            recorder.errors += 1
+        elif count_key and isinstance(result.get(count_key), int):
+            recorder.items += result[count_key]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(call) for call in calls))
+    recorder.wall_s = time.perf_counter() - started
+    return recorder
+
+def create_backend(backend: str) -> Any:
+    if backend == "memory":
+        return AsyncQdrantClient(":memory:")
+    if backend == "numpy":
+        return NumpyVectorStore()
+    return create_async_client(load_client_config())
+
+async def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+    dataset = Dataset(args.businesses, args.chunks, args.dim, args.skew)
+    server._async_qdrant_client = create_backend(args.backend)
+    # Token-bucket delays would dominate the latencies being measured
+    server.tenant_scheduler.enabled = args.admission
+    collection = args.collection
+    results: dict[str, Any] = {}
+    rss: dict[str, float] = {"start": peak_rss_mb()}
+
+    await server.delete_collection(collection)
+    created = await server.create_collection(collection, args.dim, multitenant=args.multitenant)
+    if not created.get("success"):
+        raise RuntimeError(f"Could not create benchmark collection: {created.get('error')}")
+
+    # Upsert: each tenant in requests of --upsert-request-size points
+    upserts = []
+    for business_id, size in zip(dataset.business_ids, dataset.sizes):
+        for start in range(0, size, args.upsert_request_size):
+            points = dataset.points(business_id, start, min(start + args.upsert_request_size, size))
+            upserts.append(lambda points=points: server.upsert_points(collection, points, parallel=1))
+    results["upsert_points"] = (await run_phase(upserts, args.concurrency, "points_count")).summary()
+    rss["upsert"] = peak_rss_mb()
+
+    # Search: tenants picked in proportion to their size, so big tenants are also hot
+    weights = np.array(dataset.sizes, dtype=np.float64) / sum(dataset.sizes)
+    searches = []
+    for tenant in rng.choice(len(dataset.sizes), size=args.searches, p=weights):
+        business_id = dataset.business_ids[tenant]
+        chunk_index = int(rng.integers(dataset.sizes[tenant]))
+        query = dataset.vector(business_id, chunk_index) + rng.normal(0, 0.05, args.dim).astype(np.float32)
+        searches.append(lambda business_id=business_id, query=query.tolist(): server.search_points(
+            collection, query, business_id, limit=args.search_limit
+        ))
+    results["search_points"] = (await run_phase(searches, args.concurrency, "count")).summary()
+    rss["search"] = peak_rss_mb()
+
+    # Scroll: page through whole tenants, one call per page
+    scroll = Recorder()
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def scroll_tenant(business_id: str) -> None:
+        offset = None
+        while True:
+            async with slots:
+                call_started = time.perf_counter()
+                page = await server.scroll_points(
+                    collection, business_id, limit=args.scroll_limit, offset=offset, with_vectors=False
+                )
+                scroll.latencies_ms.append((time.perf_counter() - call_started) * 1000)
+            if not page.get("success"):
+                scroll.errors += 1
+                return
+            scroll.items += page["count"]
+            offset = page["next_offset"]
+            if offset is None:
+                return
+            offset = str(offset)
+
+    await asyncio.gather(*(scroll_tenant(business_id) for business_id in dataset.business_ids))
+    scroll.wall_s = time.perf_counter() - started
+    results["scroll_points"] = scroll.summary()
+    rss["scroll"] = peak_rss_mb()
+
+    # Delete: a fraction of each tenant by ID, then its first document by payload filter
+    by_id = []
+    by_filter = []
+    for business_id, size in zip(dataset.business_ids, dataset.sizes):
+        chunk_indexes = rng.choice(size, size=max(1, int(size * args.delete_fraction)), replace=False)
+        ids = [dataset.point_id(business_id, int(i)) for i in chunk_indexes]
+        by_id.append(lambda business_id=business_id, ids=ids: server.delete_points(
+            collection, point_ids=ids, business_id=business_id
+        ))
+        by_filter.append(lambda business_id=business_id: server.delete_points(
+            collection, business_id=business_id, filters={"source": dataset.source(0)}
+        ))
+    results["delete_points[ids]"] = (await run_phase(by_id, args.concurrency)).summary()
+    results["delete_points[filter]"] = (await run_phase(by_filter, args.concurrency)).summary()
+    rss["delete"] = peak_rss_mb()
+
+    if not args.keep:
+        await server.delete_collection(collection)
+    await server._async_qdrant_client.close()
+
+    sizes = sorted(dataset.sizes)
+    return {
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "backend", "businesses", "chunks", "dim", "skew", "multitenant", "searches",
+                "search_limit", "scroll_limit", "upsert_request_size", "delete_fraction",
+                "concurrency", "seed"
+            )
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "search_cache": server.SEARCH_CACHE_ENABLED,
+            "tenant_replica": server.TENANT_REPLICA_ENABLED,
+            "max_concurrency": server.QDRANT_MAX_CONCURRENCY,
+            "admission": args.admission
+        },
+        "dataset": {
+            "points": sum(sizes),
+            "tenant_points_min": sizes[0],
+            "tenant_points_median": sizes[len(sizes) // 2],
+            "tenant_points_max": sizes[-1]
+        },
+        "results": results,
+        # Admission delays/rejections and dispatch queue waits, kept apart from results
+        "scheduler": server.tenant_scheduler.stats(),
+        "peak_rss_mb": rss
+    }
+
+def find_regressions(report: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[dict[str, Any]]:
+    """Operations whose p95 latency grew by more than tolerance over the baseline"""
+    regressions = []
+    for operation, current in report["results"].items():
+        previous = baseline.get("results", {}).get(operation)
+        if not previous or "p95_ms" not in previous or "p95_ms" not in current:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append({
+                "operation": operation,
+                "baseline_p95_ms": previous["p95_ms"],
+                "p95_ms": current["p95_ms"],
+                "change": round(current["p95_ms"] / previous["p95_ms"] - 1, 3)
+            })
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Qdrant MCP tools on synthetic tenants")
+    parser.add_argument("--backend", choices=BACKENDS, default="memory")
+    parser.add_argument("--collection", default="mcp_benchmark")
+    parser.add_argument("--businesses", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=200, help="mean chunks per business")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of tenant sizes (0 = uniform)")
+    parser.add_argument("--multitenant", action="store_true", help="use the multitenant (is_tenant) layout")
+    parser.add_argument("--searches", type=int, default=500)
+    parser.add_argument("--search-limit", type=int, default=10)
+    parser.add_argument("--scroll-limit", type=int, default=100)
+    parser.add_argument("--upsert-request-size", type=int, default=256)
+    parser.add_argument("--delete-fraction", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=8, help="tool calls in flight at once")
+    parser.add_argument("--admission", action="store_true", help="apply per-tenant admission control")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="keep the collection afterwards")
+    parser.add_argument("--output", help="write the JSON report to this file as well")
+    parser.add_argument("--baseline", help="previous report to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 increase over the baseline")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
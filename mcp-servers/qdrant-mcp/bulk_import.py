@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Resumable streaming bulk import of points from local files
+
+Input:
+- a JSONL file with one point per non-empty line, either
+  {"id": ..., "payload": {...}, "vector": [...]} or a bare payload object
+  ({"business_id": ..., "text": ...}); "id" and "vector" are optional
+- optionally a vectors file holding row i's vector for line i: a .npy array
+  of shape (n, dim), or raw little-endian float32 (any other extension,
+  requires the dimension)
+
+The JSONL is read sequentially and vectors through a read-only memmap, so
+only the batches in flight are ever held in memory. Points without an "id"
+get a UUIDv5 of (collection, source, row), where source is the points file's
+path relative to the import root. Re-sending a batch after a resume then
+overwrites rather than duplicates it, while same-named files in different
+directories (one export per tenant) get distinct IDs.
+
+Progress is recorded in a checkpoint file: the row and byte offset up to
+which every batch has landed (batches complete out of order; the checkpoint
+only advances over a contiguous prefix). An interrupted or failed import
+resumes from there.
+
+CLI (runs the server's bulk_import tool in-process, same QDRANT_* settings;
+paths are confined to --root, default QDRANT_IMPORT_ROOT or anywhere the
+invoking user can read):
+
+    python bulk_import.py --collection wab_knowledge_base \\
+        --points corpus.jsonl --vectors corpus.npy --parallel 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+import numpy as np
+
+from ingest import POINT_ID_NAMESPACE
+
+@dataclass
+class ImportBatch:
+    """A slice of the input, ready to upload"""
+    index: int
+    start_row: int
+    end_row: int
+    end_offset: int
+    ids: list[Any]
+    vectors: list[list[float]]
+    payloads: list[dict[str, Any]]
+
+def open_vectors(path: str, dimension: Optional[int] = None) -> np.ndarray:
+    """Memory-map a .npy or raw float32 vectors file as an (n, dim) array"""
+    if path.endswith(".npy"):
+        vectors = np.load(path, mmap_mode="r")
+        if vectors.ndim != 2:
+            raise ValueError(f"{path}: expected a 2-D array, got shape {vectors.shape}")
+        if dimension is not None and vectors.shape[1] != dimension:
+            raise ValueError(f"{path}: vectors have {vectors.shape[1]} dims, expected {dimension}")
+        return vectors
+    if not dimension:
+        raise ValueError(f"{path}: raw float32 vectors need the vector dimension")
+    size = os.path.getsize(path)
+    if size % (4 * dimension):
+        raise ValueError(f"{path}: {size} bytes is not a whole number of {dimension}-dim float32 vectors")
+    return np.memmap(path, dtype=np.float32, mode="r").reshape(-1, dimension)
+
+def import_point_id(collection_name: str, source: str, row: int) -> str:
+    """Deterministic ID for a point that has none in the input"""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"import\0{collection_name}\0{source}\0{row}"))
+
+def iter_batches(
+    points_path: str,
+    collection_name: str,
+    batch_size: int,
+    vectors: Optional[np.ndarray] = None,
+    start_row: int = 0,
+    start_offset: int = 0,
+    source: Optional[str] = None
+) -> Iterator[ImportBatch]:
+    """
+    Stream batches from the JSONL file, starting at a checkpointed position
+
+    source identifies the file in generated point IDs (default: its absolute path)
+    """
+    source = source or os.path.abspath(points_path)
+    index = 0
+    row = start_row
+    with open(points_path, "rb") as f:
+        f.seek(start_offset)
+        while True:
+            ids: list[Any] = []
+            batch_vectors: list[list[float]] = []
+            payloads: list[dict[str, Any]] = []
+            first_row = row
+            while len(payloads) < batch_size:
+                line = f.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{points_path}: invalid JSON on data row {row}: {e}") from e
+                if "payload" in record:
+                    payload = record["payload"] or {}
+                    vector = record.get("vector")
+                    point_id = record.get("id")
+                else:
+                    payload, vector, point_id = record, None, None
+                if vectors is None:
+                    if vector is None:
+                        raise ValueError(f"{points_path}: data row {row} has no vector and no vectors file was given")
+                    batch_vectors.append(vector)
+                ids.append(point_id if point_id is not None else import_point_id(collection_name, source, row))
+                payloads.append(payload)
+                row += 1
+            if not payloads:
+                return
+            if vectors is not None:
+                if row > len(vectors):
+                    raise ValueError(f"Vectors file has {len(vectors)} rows, points file has more")
+                batch_vectors = np.asarray(vectors[first_row:row], dtype=np.float32).tolist()
+            yield ImportBatch(index, first_row, row, f.tell(), ids, batch_vectors, payloads)
+            index += 1
+
+class Checkpoint:
+    """
+    Import progress persisted as JSON
+
+    Args:
+        path: Checkpoint file
+        source: Identity of the import (paths, collection, input sizes);
+            a checkpoint written for a different import is refused
+        restart: Ignore an existing checkpoint
+    """
+
+    def __init__(self, path: str, source: dict[str, Any], restart: bool = False):
+        self.path = path
+        self.source = source
+        self.rows = 0
+        self.offset = 0
+        self._next_index = 0
+        self._done: dict[int, tuple[int, int]] = {}
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("source") != source:
+                raise ValueError(
+                    f"Checkpoint {path} belongs to a different import ({saved.get('source')}); "
+                    f"delete it or pass restart=True"
+                )
+            self.rows = saved["rows"]
+            self.offset = saved["offset"]
+
+    def batch_done(self, batch: ImportBatch) -> bool:
+        """Record a landed batch; returns True if the watermark advanced"""
+        self._done[batch.index] = (batch.end_row, batch.end_offset)
+        advanced = False
+        while self._next_index in self._done:
+            self.rows, self.offset = self._done.pop(self._next_index)
+            self._next_index += 1
+            advanced = True
+        return advanced
+
+    def save(self, completed: bool = False) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"source": self.source, "rows": self.rows, "offset": self.offset, "completed": completed}, f)
+        os.replace(tmp_path, self.path)
+
+async def run_import(
+    batches: Iterator[ImportBatch],
+    upload: Callable[[ImportBatch], Awaitable[bool]],
+    checkpoint: Checkpoint,
+    parallel: int,
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None
+) -> dict[str, Any]:
+    """
+    Upload batches with up to `parallel` in flight, checkpointing as they land
+
+    The next batch is read (in a worker thread) only when a slot is free,
+    so memory stays bounded by parallel + 1 batches. The first failed batch
+    stops reading; batches already in flight finish and the checkpoint
+    stays just before the failure.
+
+    Returns:
+        Points uploaded in this run, batches sent/failed, and the
+        checkpointed row
+    """
+    in_flight: set[asyncio.Task] = set()
+    uploaded = 0
+    sent = 0
+    failed = 0
+    error: Optional[str] = None
+    finished = False
+
+    async def send(batch: ImportBatch) -> None:
+        nonlocal uploaded, failed, error
+        try:
+            landed = await upload(batch)
+        except Exception as e:
+            landed = False
+            error = f"Rows {batch.start_row}-{batch.end_row - 1}: {e}"
+        if not landed:
+            failed += 1
+            return
+        uploaded += batch.end_row - batch.start_row
+        if checkpoint.batch_done(batch):
+            checkpoint.save()
+            if on_progress is not None:
+                await on_progress(checkpoint.rows)
+
+    try:
+        while not failed:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                finished = True
+                break
+            sent += 1
+            in_flight.add(asyncio.ensure_future(send(batch)))
+            if len(in_flight) >= max(1, parallel):
+                _, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        checkpoint.save(completed=finished and not failed)
+
+    summary = {
+        "points_count": uploaded,
+        "batches_sent": sent,
+        "batches_failed": failed,
+        "checkpoint_rows": checkpoint.rows,
+        "completed": finished and not failed
+    }
+    if error is not None:
+        summary["error"] = error
+    return summary
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Stream points from JSONL (+ NPY/float32 vectors) into Qdrant")
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--points", required=True, help="JSONL file, one point or payload per line")
+    parser.add_argument("--vectors", help=".npy or raw float32 file with one vector per JSONL row")
+    parser.add_argument("--dim", type=int, help="vector dimension (required for raw float32 files)")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--parallel", type=int)
+    parser.add_argument("--max-retries", type=int)
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <points>.<collection>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--root", help="directory the files must be in (default: QDRANT_IMPORT_ROOT, else /)")
+    args = parser.parse_args()
+
+    import server
+
+    # The MCP tool is disabled without QDRANT_IMPORT_ROOT; the CLI runs with
+    # the invoking user's own file access
+    server.BULK_IMPORT_ROOT = args.root or server.BULK_IMPORT_ROOT or os.path.abspath(os.sep)
+
+    options = {
+        key: value
+        for key, value in (
+            ("batch_size", args.batch_size),
+            ("parallel", args.parallel),
+            ("max_retries", args.max_retries)
+        )
+        if value is not None
+    }
+    result = asyncio.run(server.bulk_import(
+        collection_name=args.collection,
+        points_path=os.path.abspath(args.points),
+        vectors_path=os.path.abspath(args.vectors) if args.vectors else None,
+        vector_dim=args.dim,
+        checkpoint_path=os.path.abspath(args.checkpoint) if args.checkpoint else None,
+        restart=args.restart,
+        **options
+    ))
+    print(json.dumps(result, indent=2))
+    return 0 if result.get("success") else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
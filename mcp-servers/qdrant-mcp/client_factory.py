@@ -0,0 +1,175 @@
+"""
+Qdrant client construction shared by the server and the setup scripts
+
+Settings are resolved in order: built-in defaults, then a JSON config file
+(QDRANT_CONFIG_FILE), then environment variables. There is no default
+endpoint or API key: the qdrant backend needs QDRANT_URL (or "url" in the
+config file), and QDRANT_API_KEY is only read from the same places. gRPC (prefer_grpc) uses a
+pool of channels with keepalive pings and optional gzip compression; REST
+uses a pooled httpx client with HTTP/2 and keepalive expiry.
+
+With backend "numpy" the server runs on the in-process NumpyVectorStore
+(numpy_backend.py) instead of a Qdrant cluster.
+"""
+
+import json
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Optional, Union
+
+import httpx
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from numpy_backend import NumpyVectorStore
+
+COMPRESSION_MODES = ("none", "gzip")
+BACKENDS = ("qdrant", "numpy")
+
+@dataclass
+class ClientConfig:
+    """
+    Connection settings for a Qdrant client
+
+    Attributes:
+        url: Qdrant endpoint (REST port; gRPC uses grpc_port on the same host);
+            required by the qdrant backend
+        api_key: API key (None: unauthenticated, e.g. a local Qdrant)
+        prefer_grpc: Use gRPC for every call that supports it
+        grpc_port: gRPC port
+        timeout: Request timeout in seconds (None: client default)
+        pool_size: gRPC channels, or max REST connections (None: client default)
+        http2: Use HTTP/2 for REST (needs httpx[http2])
+        keepalive_expiry: Seconds an idle REST connection is kept open
+        grpc_keepalive_ms: Interval of gRPC keepalive pings
+        compression: gRPC request compression: "none" or "gzip"
+        backend: "qdrant" (remote cluster) or "numpy" (in-process store)
+        numpy_path: Directory the numpy backend persists to (None: memory only)
+    """
+    url: Optional[str] = None
+    api_key: Optional[str] = None
+    prefer_grpc: bool = False
+    grpc_port: int = 6334
+    timeout: Optional[int] = None
+    pool_size: Optional[int] = None
+    http2: bool = False
+    keepalive_expiry: float = 30.0
+    grpc_keepalive_ms: int = 30000
+    compression: str = "none"
+    backend: str = "qdrant"
+    numpy_path: Optional[str] = None
+
+# Environment variable -> ClientConfig field
+ENV_VARS = {
+    "QDRANT_URL": "url",
+    "QDRANT_API_KEY": "api_key",
+    "QDRANT_PREFER_GRPC": "prefer_grpc",
+    "QDRANT_GRPC_PORT": "grpc_port",
+    "QDRANT_TIMEOUT": "timeout",
+    "QDRANT_POOL_SIZE": "pool_size",
+    "QDRANT_HTTP2": "http2",
+    "QDRANT_KEEPALIVE_EXPIRY": "keepalive_expiry",
+    "QDRANT_GRPC_KEEPALIVE_MS": "grpc_keepalive_ms",
+    "QDRANT_COMPRESSION": "compression",
+    "QDRANT_BACKEND": "backend",
+    "QDRANT_NUMPY_PATH": "numpy_path",
+}
+
+def _parse(field_name: str, value: Any) -> Any:
+    """Convert a config file or environment value to the field's type"""
+    default = ClientConfig.__dataclass_fields__[field_name].default
+    if value is None or (isinstance(value, str) and value.lower() in ("", "none", "null")):
+        return default
+    if isinstance(default, bool):
+        return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes")
+    if field_name in ("grpc_port", "timeout", "pool_size", "grpc_keepalive_ms"):
+        return int(value)
+    if field_name == "keepalive_expiry":
+        return float(value)
+    return str(value)
+
+def load_client_config(config_file: Optional[str] = None) -> ClientConfig:
+    """
+    Resolve client settings from defaults, config file and environment
+
+    Args:
+        config_file: JSON file with ClientConfig field names as keys
+            (default: $QDRANT_CONFIG_FILE, if set)
+
+    Returns:
+        Resolved ClientConfig
+    """
+    config = ClientConfig()
+    config_file = config_file or os.environ.get("QDRANT_CONFIG_FILE")
+    if config_file:
+        with open(config_file) as f:
+            values = json.load(f)
+        known = {field.name for field in fields(ClientConfig)}
+        unknown = set(values) - known
+        if unknown:
+            raise ValueError(f"Unknown Qdrant client settings in {config_file}: {', '.join(sorted(unknown))}")
+        for name, value in values.items():
+            setattr(config, name, _parse(name, value))
+    for env_var, name in ENV_VARS.items():
+        if env_var in os.environ:
+            setattr(config, name, _parse(name, os.environ[env_var]))
+    if config.compression not in COMPRESSION_MODES:
+        raise ValueError(f"Unknown compression '{config.compression}' (expected: {', '.join(COMPRESSION_MODES)})")
+    if config.backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{config.backend}' (expected: {', '.join(BACKENDS)})")
+    return config
+
+def client_kwargs(config: ClientConfig) -> dict[str, Any]:
+    """Keyword arguments for QdrantClient / AsyncQdrantClient"""
+    if not config.url:
+        raise ValueError(
+            "No Qdrant endpoint configured: set QDRANT_URL (and QDRANT_API_KEY if the cluster needs one), "
+            "or point QDRANT_CONFIG_FILE at a JSON file with \"url\" and \"api_key\""
+        )
+    kwargs: dict[str, Any] = {
+        "url": config.url,
+        "api_key": config.api_key,
+        "prefer_grpc": config.prefer_grpc,
+        "grpc_port": config.grpc_port,
+        "timeout": config.timeout,
+        "http2": config.http2,
+    }
+    if config.prefer_grpc:
+        import grpc
+
+        # pool_size sizes the gRPC channel pool (and the REST fallback's connections)
+        kwargs["pool_size"] = config.pool_size
+        kwargs["grpc_options"] = {
+            "grpc.keepalive_time_ms": config.grpc_keepalive_ms,
+            "grpc.keepalive_permit_without_calls": 1,
+            "grpc.http2.max_pings_without_data": 0,
+        }
+        if config.compression == "gzip":
+            kwargs["grpc_compression"] = grpc.Compression.Gzip
+    else:
+        kwargs["limits"] = httpx.Limits(
+            max_connections=config.pool_size,
+            max_keepalive_connections=config.pool_size,
+            keepalive_expiry=config.keepalive_expiry
+        )
+    return kwargs
+
+def describe(config: ClientConfig) -> str:
+    """One-line summary for logs (no credentials)"""
+    if config.backend == "numpy":
+        return f"in-process numpy store ({config.numpy_path or 'memory only'})"
+    transport = f"gRPC:{config.grpc_port}" if config.prefer_grpc else ("REST/HTTP2" if config.http2 else "REST")
+    return f"{config.url} via {transport} (pool_size={config.pool_size}, timeout={config.timeout})"
+
+def create_client(config: Optional[ClientConfig] = None) -> QdrantClient:
+    """Build a synchronous client (setup scripts)"""
+    config = config or load_client_config()
+    if config.backend != "qdrant":
+        raise ValueError(f"Synchronous clients need the qdrant backend, not '{config.backend}'")
+    return QdrantClient(**client_kwargs(config))
+
+def create_async_client(config: Optional[ClientConfig] = None) -> Union[AsyncQdrantClient, NumpyVectorStore]:
+    """Build an async client (MCP server)"""
+    config = config or load_client_config()
+    if config.backend == "numpy":
+        return NumpyVectorStore(config.numpy_path)
+    return AsyncQdrantClient(**client_kwargs(config))
@@ -0,0 +1,183 @@
+"""
+Collection layout helpers shared by the MCP server and setup scripts
+Builds the Qdrant configuration for WABuilder's multi-tenant knowledge base
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CompressionRatio,
+    HnswConfigDiff,
+    KeywordIndexParams,
+    KeywordIndexType,
+    Modifier,
+    OptimizersConfigDiff,
+    ProductQuantization,
+    ProductQuantizationConfig,
+    QuantizationConfig,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SparseVectorParams,
+)
+
+# Payload field that identifies the tenant of every point
+TENANT_FIELD = "business_id"
+
+# Shard key used for every tenant without a dedicated shard
+DEFAULT_SHARD_KEY = "default"
+
+# Named sparse vector holding BM25 term weights in hybrid collections
+SPARSE_VECTOR_NAME = "bm25"
+
+# Payload field the sparse vector is computed from
+TEXT_FIELD = "text"
+
+def hnsw_config(
+    m: Optional[int] = None,
+    ef_construct: Optional[int] = None,
+    on_disk: Optional[bool] = None,
+    payload_m: Optional[int] = None
+) -> Optional[HnswConfigDiff]:
+    """
+    Build an HNSW config from the options that were set
+
+    Args:
+        m: Graph degree (higher = better recall, more RAM); 0 disables the global graph
+        ef_construct: Candidate list size while building (higher = better graph, slower indexing)
+        on_disk: Store the graph in memory-mapped files instead of RAM
+        payload_m: Graph degree of per-payload-value (per-tenant) graphs
+
+    Returns:
+        HnswConfigDiff, or None when nothing was set
+    """
+    values = {
+        "m": m,
+        "ef_construct": ef_construct,
+        "on_disk": on_disk,
+        "payload_m": payload_m,
+    }
+    values = {key: value for key, value in values.items() if value is not None}
+    return HnswConfigDiff(**values) if values else None
+
+def multitenant_hnsw_config(
+    payload_m: int = 16,
+    ef_construct: Optional[int] = None,
+    on_disk: Optional[bool] = None
+) -> HnswConfigDiff:
+    """
+    HNSW config that builds one graph per tenant instead of a global graph
+
+    m=0 disables the global graph; payload_m builds a graph for each value of
+    the tenant index, so small tenants search a small graph and large tenants
+    never pay for filtering out everyone else.
+
+    Args:
+        payload_m: Graph degree of the per-tenant graphs
+        ef_construct: Candidate list size while building the graphs
+        on_disk: Store the graphs in memory-mapped files instead of RAM
+    """
+    return hnsw_config(m=0, ef_construct=ef_construct, on_disk=on_disk, payload_m=payload_m)
+
+def optimizers_config(
+    indexing_threshold: Optional[int] = None,
+    memmap_threshold: Optional[int] = None
+) -> Optional[OptimizersConfigDiff]:
+    """
+    Build an optimizer config from the options that were set
+
+    Args:
+        indexing_threshold: Segment size (KB of vectors) above which an HNSW
+            index is built; smaller segments are searched by brute force
+        memmap_threshold: Segment size (KB of vectors) above which the segment
+            is moved to memory-mapped storage
+
+    Returns:
+        OptimizersConfigDiff, or None when nothing was set
+    """
+    values = {
+        "indexing_threshold": indexing_threshold,
+        "memmap_threshold": memmap_threshold,
+    }
+    values = {key: value for key, value in values.items() if value is not None}
+    return OptimizersConfigDiff(**values) if values else None
+
+def tenant_index_schema() -> KeywordIndexParams:
+    """Keyword index on the tenant field, marked so Qdrant co-locates tenant data"""
+    return KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=True)
+
+# Supported vector quantization modes and their storage reduction vs float32
+QUANTIZATION_MODES = {
+    "scalar": "int8, 4x smaller",
+    "binary": "1 bit per dimension, 32x smaller",
+    "product": "product quantization, 4x-64x smaller (see product_compression)",
+}
+
+def quantization_config(
+    mode: Optional[str],
+    always_ram: bool = True,
+    quantile: float = 0.99,
+    product_compression: str = "x16"
+) -> Optional[QuantizationConfig]:
+    """
+    Build a Qdrant quantization config
+
+    Quantized vectors are kept in RAM (always_ram) while the original float32
+    vectors can stay on disk and are only read to rescore the top candidates.
+
+    Args:
+        mode: "scalar", "binary", "product", or None/"none" for no quantization
+        always_ram: Keep the quantized vectors in RAM
+        quantile: Scalar quantization quantile used to clip outliers
+        product_compression: Product quantization ratio: x4, x8, x16, x32, x64
+
+    Returns:
+        Quantization config, or None when mode is None/"none"
+    """
+    if mode is None or mode == "none":
+        return None
+    if mode == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=quantile, always_ram=always_ram)
+        )
+    if mode == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+    if mode == "product":
+        return ProductQuantization(
+            product=ProductQuantizationConfig(
+                compression=CompressionRatio(product_compression),
+                always_ram=always_ram
+            )
+        )
+    raise ValueError(
+        f"Unknown quantization mode '{mode}' (expected one of: {', '.join(QUANTIZATION_MODES)}, none)"
+    )
+
+def sparse_vectors_config() -> dict[str, SparseVectorParams]:
+    """Sparse vector config for hybrid collections; Qdrant applies BM25 IDF at query time"""
+    return {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)}
+
+def shard_key_for(business_id: Optional[str], dedicated_tenants: set[str]) -> str:
+    """Shard key a tenant's points live under in a custom-sharded collection"""
+    if business_id is not None and business_id in dedicated_tenants:
+        return business_id
+    return DEFAULT_SHARD_KEY
+
+@dataclass
+class CollectionLayout:
+    """What the server needs to know about a collection to route requests"""
+    custom_sharding: bool = False
+    dedicated_tenants: set[str] = field(default_factory=set)
+    sparse_vector: Optional[str] = None
+    loaded_at: float = field(default_factory=time.monotonic)
+    shards_read_at: float = field(default_factory=time.monotonic)
+
+    def shard_key(self, business_id: Optional[str]) -> Optional[str]:
+        """Shard key selector for a tenant, or None for auto-sharded collections"""
+        if not self.custom_sharding:
+            return None
+        return shard_key_for(business_id, self.dedicated_tenants)
@@ -0,0 +1,107 @@
+"""
+Pluggable embedding backends for server-side ingestion
+
+Backends:
+- hash: deterministic vectors derived from md5(text), for offline tests and
+  benchmarks (same idea as simulate_embedding in test_full_rag_pipeline.py)
+- http: an OpenAI-compatible /v1/embeddings endpoint (e.g. the gpu-ai service)
+
+Select a backend with EMBEDDER_BACKEND (default: http). The hash backend
+produces vectors with no meaning; only tests, benchmark.py and loadgen.py
+select it.
+"""
+
+import hashlib
+import os
+from typing import Optional
+
+import httpx
+import numpy as np
+
+# Embedding configuration
+EMBEDDER_BACKEND = os.environ.get("EMBEDDER_BACKEND", "http")
+EMBEDDER_MODEL = os.environ.get("EMBEDDER_MODEL", "all-MiniLM-L6-v2")
+EMBEDDER_URL = os.environ.get("EMBEDDER_URL", "http://localhost:8000/v1/embeddings")
+EMBEDDER_API_KEY = os.environ.get("EMBEDDER_API_KEY")
+EMBEDDING_DIM = int(os.environ.get("EMBEDDING_DIM", "384"))
+EMBEDDER_TIMEOUT = float(os.environ.get("EMBEDDER_TIMEOUT", "30"))
+
+class Embedder:
+    """
+    Base class for embedding backends
+
+    Attributes:
+        model_name: Identifies the model; part of every embedding cache key
+        dimension: Length of the produced vectors
+    """
+
+    model_name: str
+    dimension: int
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed a batch of texts
+
+        Returns:
+            float32 array of shape (len(texts), dimension)
+        """
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        """Release network resources held by the backend"""
+
+class HashEmbedder(Embedder):
+    """Deterministic pseudo-embeddings seeded by md5(text); no model needed"""
+
+    def __init__(self, dimension: int = EMBEDDING_DIM, model_name: Optional[str] = None):
+        self.dimension = dimension
+        self.model_name = model_name or f"hash-md5-{dimension}"
+
+    def embed_one(self, text: str) -> np.ndarray:
+        seed = int(hashlib.md5(text.encode()).hexdigest(), 16)
+        return np.random.default_rng(seed).random(self.dimension, dtype=np.float32)
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            vectors[i] = self.embed_one(text)
+        return vectors
+
+class HttpEmbedder(Embedder):
+    """Client for an OpenAI-compatible embeddings endpoint"""
+
+    def __init__(
+        self,
+        url: str = EMBEDDER_URL,
+        model_name: str = EMBEDDER_MODEL,
+        dimension: int = EMBEDDING_DIM,
+        api_key: Optional[str] = EMBEDDER_API_KEY,
+        timeout: float = EMBEDDER_TIMEOUT
+    ):
+        self.url = url
+        self.model_name = model_name
+        self.dimension = dimension
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._client = httpx.AsyncClient(headers=headers, timeout=timeout)
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        response = await self._client.post(self.url, json={"model": self.model_name, "input": texts})
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        vectors = np.asarray([item["embedding"] for item in data], dtype=np.float32)
+        if vectors.shape != (len(texts), self.dimension):
+            raise ValueError(
+                f"Embedder returned shape {vectors.shape}, expected ({len(texts)}, {self.dimension})"
+            )
+        return vectors
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+def create_embedder(backend: str = EMBEDDER_BACKEND) -> Embedder:
+    """Build the embedder selected by EMBEDDER_BACKEND"""
+    if backend == "hash":
+        return HashEmbedder()
+    if backend == "http":
+        return HttpEmbedder()
+    raise ValueError(f"Unknown embedder backend '{backend}' (expected: hash, http)")
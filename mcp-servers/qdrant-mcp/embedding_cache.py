@@ -0,0 +1,186 @@
+"""
+Persistent embedding cache keyed by (model name, content hash)
+
+The store is set-associative, like a CPU cache: a key can only live in the
+WAYS slots of the set its hash selects. Three memory-mapped arrays hold, per
+slot, the float32 vector, the 16-byte key (all zeros: empty) and the time it
+was last used. There is no separate index: the key array is the index, so
+the store survives restarts and needs no flush beyond the memmaps'. Once a
+set is full its least recently used slot is reused.
+
+Every MCP stdio session is its own process, and they share the directory.
+Because every process finds a key by probing the same set in the same
+files, there is no per-process slot map to go stale. Slots are allocated
+and written under an exclusive flock and read under a shared one. A write
+clears the slot's key before it replaces the vector, so a crash can lose an
+entry but never return a wrong vector. Last-used times are updated under
+the shared lock; a lost update only makes eviction slightly less exact.
+"""
+
+import fcntl
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+from embedders import Embedder
+
+KEY_BYTES = 16
+WAYS = 8
+
+def cache_key(model_name: str, text: str) -> bytes:
+    """Key of one embedding: model name plus sha256 of the text"""
+    content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{model_name}\0{content_hash}".encode()).digest()[:KEY_BYTES]
+
+class EmbeddingCache:
+    """
+    Disk-backed, size-bounded store of embedding vectors, shareable by processes
+
+    Args:
+        directory: Directory holding the store (one store per dimension and
+            capacity, so processes configured differently never share files)
+        dimension: Vector length
+        max_bytes: Size bound of the vector file; sets the slot capacity
+    """
+
+    def __init__(self, directory: str, dimension: int, max_bytes: int):
+        self.dimension = dimension
+        self.ways = min(WAYS, max(1, max_bytes // (dimension * 4)))
+        self.sets = max(1, max_bytes // (dimension * 4 * self.ways))
+        self.capacity = self.sets * self.ways
+        os.makedirs(directory, exist_ok=True)
+        name = f"{dimension}-{self.capacity}"
+        self._lock_file = open(os.path.join(directory, f"lock-{name}"), "a+b")
+
+        with self._locked(shared=False):
+            self._vectors = self._map(os.path.join(directory, f"vectors-{name}.f32"), np.float32, dimension)
+            self._keys = self._map(os.path.join(directory, f"keys-{name}.bin"), np.uint8, KEY_BYTES)
+            self._used = self._map(os.path.join(directory, f"used-{name}.f64"), np.float64)
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _map(self, path: str, dtype: Any, width: Optional[int] = None) -> np.memmap:
+        """Open (or create, zero-filled) one per-slot array; call with the exclusive lock"""
+        shape = (self.capacity, width) if width else (self.capacity,)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        mode = "r+" if os.path.exists(path) and os.path.getsize(path) == size else "w+"
+        return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+    @contextmanager
+    def _locked(self, shared: bool) -> Iterator[None]:
+        """flock the store against writers in other processes"""
+        fcntl.flock(self._lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _probe(self, key: bytes) -> tuple[int, np.ndarray, Optional[int]]:
+        """First slot of the key's set, the key as a row, and its slot if stored"""
+        start = int.from_bytes(key[:8], "little") % self.sets * self.ways
+        row = np.frombuffer(key, dtype=np.uint8)
+        found = np.flatnonzero((self._keys[start:start + self.ways] == row).all(axis=1))
+        return start, row, start + int(found[0]) if len(found) else None
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """Return a copy of the cached vector, or None"""
+        with self._locked(shared=True):
+            _, _, slot = self._probe(key)
+            if slot is not None:
+                vector = np.array(self._vectors[slot])
+                self._used[slot] = time.time()
+        if slot is None:
+            self.misses += 1
+            return None
+        self._dirty = True
+        self.hits += 1
+        return vector
+
+    def put(self, key: bytes, vector: np.ndarray) -> None:
+        """Store a vector, evicting the least recently used one of its set when full"""
+        with self._locked(shared=False):
+            start, row, slot = self._probe(key)
+            if slot is None:
+                empty = np.flatnonzero(~self._keys[start:start + self.ways].any(axis=1))
+                if len(empty):
+                    slot = start + int(empty[0])
+                else:
+                    slot = start + int(np.argmin(self._used[start:start + self.ways]))
+                    self.evictions += 1
+            self._keys[slot] = 0
+            self._vectors[slot] = vector
+            self._keys[slot] = row
+            self._used[slot] = time.time()
+        self._dirty = True
+
+    def flush(self) -> None:
+        """Write the memory-mapped arrays to disk"""
+        if not self._dirty:
+            return
+        with self._locked(shared=True):
+            self._vectors.flush()
+            self._keys.flush()
+            self._used.flush()
+        self._dirty = False
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._locked(shared=True):
+            entries = int(self._keys.any(axis=1).sum())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "capacity": self.capacity,
+            "size_bytes": self.capacity * self.dimension * 4
+        }
+
+class CachedEmbedder(Embedder):
+    """Embedder wrapper that only embeds texts missing from the cache"""
+
+    def __init__(self, embedder: Embedder, cache: EmbeddingCache):
+        if embedder.dimension != cache.dimension:
+            raise ValueError(
+                f"Embedder dimension {embedder.dimension} does not match cache dimension {cache.dimension}"
+            )
+        self.embedder = embedder
+        self.cache = cache
+        self.model_name = embedder.model_name
+        self.dimension = embedder.dimension
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        keys = [cache_key(self.model_name, text) for text in texts]
+
+        # Texts to embed, deduplicated: key -> positions in the batch
+        missing: dict[bytes, list[int]] = {}
+        for i, key in enumerate(keys):
+            if key in missing:
+                missing[key].append(i)
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                missing[key] = [i]
+            else:
+                vectors[i] = cached
+
+        if missing:
+            positions = list(missing.values())
+            embedded = await self.embedder.embed([texts[p[0]] for p in positions])
+            for key, rows, vector in zip(missing, positions, embedded):
+                self.cache.put(key, vector)
+                vectors[rows] = vector
+        return vectors
+
+    async def aclose(self) -> None:
+        self.cache.flush()
+        await self.embedder.aclose()
@@ -0,0 +1,226 @@
+"""
+Streaming chunk -> embed -> upsert pipeline for server-side ingestion
+
+Documents are chunked lazily and embedded in batches. Each embedded batch is
+handed to the upsert stage through a bounded queue, so embedding the next
+batch overlaps with uploading the previous one and memory stays bounded by
+the queue size, not the document size.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, Iterator, Optional
+
+import numpy as np
+
+from embedders import Embedder
+
+# Sentence boundary used to split paragraphs that exceed the chunk size
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Point ID modes: random UUIDv4, or UUIDv5 of business_id + source + chunk key
+ID_MODES = ("random", "chunk_index", "content_hash")
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "wabuilder/qdrant-mcp/points")
+
+@dataclass
+class Chunk:
+    """One chunk of a document, ready to embed"""
+    doc_index: int
+    chunk_index: int
+    text: str
+    content_hash: str
+    occurrence: int = 0
+
+def content_hash(text: str) -> str:
+    """Stable hash of chunk text, stored in the payload for change detection"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def point_id(
+    id_mode: str,
+    business_id: str = "",
+    source: str = "",
+    chunk_index: Any = None,
+    chunk_hash: Optional[str] = None,
+    occurrence: int = 0
+) -> str:
+    """
+    ID of a chunk point
+
+    In the deterministic modes the same chunk always maps to the same UUIDv5,
+    so retried or repeated upserts overwrite the point instead of adding a
+    duplicate.
+
+    Args:
+        id_mode: "random", "chunk_index" (position within the source) or
+            "content_hash" (chunk text, stable when chunks move)
+        business_id: Business ID owning the chunk
+        source: Source document of the chunk
+        chunk_index: Position of the chunk, for "chunk_index"
+        chunk_hash: content_hash of the chunk, for "content_hash"
+        occurrence: How many earlier chunks of the source have the same
+            content_hash, so repeated text (a menu block pasted twice) gets
+            one point per copy
+
+    Returns:
+        Point ID as a UUID string
+    """
+    if id_mode == "random":
+        return str(uuid.uuid4())
+    if id_mode not in ID_MODES:
+        raise ValueError(f"Unknown id_mode '{id_mode}' (expected one of: {', '.join(ID_MODES)})")
+    key = chunk_index if id_mode == "chunk_index" else chunk_hash
+    if key is None or not business_id or not source:
+        raise ValueError(f"id_mode '{id_mode}' needs business_id, source and {id_mode}")
+    if id_mode == "content_hash" and occurrence:
+        key = f"{key}:{occurrence}"
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{business_id}\0{source}\0{id_mode}:{key}"))
+
+def chunk_text(text: str, max_chars: int = 800, overlap: int = 100) -> list[str]:
+    """
+    Split text into chunks of at most max_chars
+
+    Paragraphs are packed together while they fit; paragraphs longer than
+    max_chars are split at sentence boundaries, and sentences longer than
+    max_chars are split hard with `overlap` characters of context.
+
+    Args:
+        text: Document text
+        max_chars: Maximum characters per chunk
+        overlap: Characters repeated between hard-split pieces
+
+    Returns:
+        List of non-empty chunks
+    """
+    pieces: list[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in SENTENCE_END.split(paragraph):
+            if len(sentence) <= max_chars:
+                pieces.append(sentence)
+                continue
+            step = max(1, max_chars - overlap)
+            pieces.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), step))
+
+    chunks: list[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def iter_chunks(documents: list[dict[str, Any]], max_chars: int, overlap: int) -> Iterator[Chunk]:
+    """Lazily chunk every document"""
+    for doc_index, document in enumerate(documents):
+        seen: dict[str, int] = {}
+        for chunk_index, text in enumerate(chunk_text(document["text"], max_chars, overlap)):
+            chunk_hash = content_hash(text)
+            occurrence = seen.get(chunk_hash, 0)
+            seen[chunk_hash] = occurrence + 1
+            yield Chunk(doc_index, chunk_index, text, chunk_hash, occurrence)
+
+def _batched(chunks: Iterable[Chunk], size: int) -> Iterator[list[Chunk]]:
+    batch: list[Chunk] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def run_pipeline(
+    chunks: Iterable[Chunk],
+    documents_count: int,
+    embedder: Embedder,
+    upsert: Callable[[list[Chunk], np.ndarray], Awaitable[int]],
+    embed_batch_size: int = 64,
+    queue_size: int = 2
+) -> list[dict[str, Any]]:
+    """
+    Embed and upsert chunks as a two-stage streaming pipeline
+
+    Args:
+        chunks: Chunks to store, usually iter_chunks() so chunking is lazy
+        documents_count: Number of documents the chunks belong to
+        embedder: Embedding backend
+        upsert: Coroutine storing one embedded batch; returns points stored
+        embed_batch_size: Chunks per embedding call (and per upsert)
+        queue_size: Embedded batches buffered ahead of the upsert stage
+
+    Returns:
+        Per-document stats: chunks, points_upserted, chunk_ms, embed_ms, upsert_ms
+    """
+    stats = [
+        {"chunks": 0, "points_upserted": 0, "chunk_ms": 0.0, "embed_ms": 0.0, "upsert_ms": 0.0}
+        for _ in range(documents_count)
+    ]
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+
+    def attribute(batch: list[Chunk], key: str, elapsed_ms: float) -> None:
+        # Batches span documents; split the batch time by each document's share
+        for chunk in batch:
+            stats[chunk.doc_index][key] += elapsed_ms / len(batch)
+
+    async def produce() -> None:
+        try:
+            batches = _batched(chunks, embed_batch_size)
+            while True:
+                started = time.perf_counter()
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                attribute(batch, "chunk_ms", (time.perf_counter() - started) * 1000)
+                for chunk in batch:
+                    stats[chunk.doc_index]["chunks"] += 1
+
+                started = time.perf_counter()
+                vectors = await embedder.embed([chunk.text for chunk in batch])
+                attribute(batch, "embed_ms", (time.perf_counter() - started) * 1000)
+                await queue.put((batch, vectors))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    async def consume() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            batch, vectors = item
+            started = time.perf_counter()
+            stored = await upsert(batch, vectors)
+            attribute(batch, "upsert_ms", (time.perf_counter() - started) * 1000)
+            if stored == len(batch):
+                for chunk in batch:
+                    stats[chunk.doc_index]["points_upserted"] += 1
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        await consume()
+    except BaseException:
+        # An upsert failure must not leave the producer blocked on a full queue
+        producer.cancel()
+        raise
+    await producer
+
+    for doc_stats in stats:
+        for key in ("chunk_ms", "embed_ms", "upsert_ms"):
+            doc_stats[key] = round(doc_stats[key], 2)
+    return stats
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator replaying the WABuilder RAG flow over MCP stdio
+
+Starts server.py as a subprocess (the real MCP transport), preloads one
+knowledge document per simulated business, then offers Poisson arrivals at
+a series of target rates. Each arrival is one of:
+- search: a customer question, embedded client-side with the md5 hash
+  embedder, sent to search_points, then assembled into a prompt
+- ingest: a new document for the business via ingest_documents
+- delete: removal of a document ingested earlier in the run (delete_points)
+
+Arrivals are scheduled independently of completions (open loop). Latency
+is reported twice: service time (request sent -> response) and response
+time measured from the *intended* arrival time, which corrects for
+coordinated omission when the client falls behind or --max-in-flight
+queues requests. The first rate whose achieved throughput, p99 response
+time or error rate misses its target marks the saturation point.
+
+    python loadgen.py --businesses 2000 --rates 10,25,50,100,200 --step-seconds 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import timedelta
+from typing import Any, Optional
+
+import numpy as np
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from embedders import EMBEDDING_DIM, HashEmbedder
+from vector_codec import encode_vector
+
+SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+OPERATIONS = ("search", "ingest", "delete")
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+VOCABULARY = (
+    "opening hours delivery price menu order refund booking table appointment "
+    "payment card cash shipping address warranty return exchange size colour "
+    "stock discount promotion loyalty points gift voucher contact support "
+    "parking location weekend holiday vegetarian allergy ingredients service"
+).split()
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parse "search=0.8,ingest=0.15,delete=0.05" into normalized weights"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}' (expected one of: {', '.join(OPERATIONS)})")
+        mix[name] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("Operation mix weights must sum to more than 0")
+    return {name: weight / total for name, weight in mix.items()}
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    points = np.percentile(np.array(values), PERCENTILES)
+    summary = {f"p{p:g}": round(float(v), 2) for p, v in zip(PERCENTILES, points)}
+    summary["max"] = round(max(values), 2)
+    return summary
+
+class Workload:
+    """Simulated businesses, their documents and their customers' questions"""
+
+    def __init__(self, businesses: int, skew: float, dimension: int, seed: int):
+        self.rng = np.random.default_rng(seed)
+        self.business_ids = [f"load-business-{i:05d}" for i in range(businesses)]
+        weights = 1.0 / np.arange(1, businesses + 1) ** skew
+        self.popularity = weights / weights.sum()
+        self.embedder = HashEmbedder(dimension)
+        # Documents ingested during the run, per business, available for deletes
+        self.extra_documents: dict[str, list[str]] = {}
+        self._next_document: dict[str, int] = {}
+
+    def pick_business(self) -> str:
+        return self.business_ids[self.rng.choice(len(self.business_ids), p=self.popularity)]
+
+    def sentence(self, words: int) -> str:
+        chosen = self.rng.choice(VOCABULARY, size=words)
+        return " ".join(chosen).capitalize() + "."
+
+    def document(self, business_id: str) -> dict[str, Any]:
+        index = self._next_document.get(business_id, 0)
+        self._next_document[business_id] = index + 1
+        paragraphs = [
+            " ".join(self.sentence(int(self.rng.integers(6, 16))) for _ in range(int(self.rng.integers(3, 8))))
+            for _ in range(int(self.rng.integers(2, 6)))
+        ]
+        return {"text": "\n\n".join(paragraphs), "source": f"doc-{index}.txt", "category": "faq"}
+
+    def question(self) -> str:
+        customer = int(self.rng.integers(1_000_000))
+        return f"customer {customer}: " + self.sentence(int(self.rng.integers(4, 10)))
+
+class Step:
+    """Outcome of one offered-load step"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.response_ms: dict[str, list[float]] = {op: [] for op in OPERATIONS}
+        self.service_ms: dict[str, list[float]] = {op: [] for op in OPERATIONS}
+        self.errors: dict[str, int] = {op: 0 for op in OPERATIONS}
+        self.timeouts = 0
+        self.scheduled = 0
+        self.completed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.max_send_lag_ms = 0.0
+
+    def summary(self, window: float, duration: float) -> dict[str, Any]:
+        response = [v for values in self.response_ms.values() for v in values]
+        service = [v for values in self.service_ms.values() for v in values]
+        errors = sum(self.errors.values())
+        return {
+            "offered_rps": self.rate,
+            "scheduled_rps": round(self.scheduled / window, 2),
+            "achieved_rps": round(self.completed / duration, 2),
+            "requests": self.scheduled,
+            "completed": self.completed,
+            "errors": errors,
+            "timeouts": self.timeouts,
+            "error_rate": round(errors / self.scheduled, 4) if self.scheduled else 0.0,
+            "max_in_flight": self.max_in_flight,
+            "max_send_lag_ms": round(self.max_send_lag_ms, 2),
+            "response_ms": percentiles(response),
+            "service_ms": percentiles(service),
+            "by_operation": {
+                op: {
+                    "count": len(self.response_ms[op]),
+                    "errors": self.errors[op],
+                    "response_ms": percentiles(self.response_ms[op]),
+                    "service_ms": percentiles(self.service_ms[op])
+                }
+                for op in OPERATIONS
+                if self.response_ms[op]
+            }
+        }
+
+class LoadGenerator:
+    def __init__(self, session: ClientSession, workload: Workload, args: argparse.Namespace):
+        self.session = session
+        self.workload = workload
+        self.args = args
+        self.timeout = timedelta(seconds=args.timeout)
+        self.slots = asyncio.Semaphore(args.max_in_flight) if args.max_in_flight else None
+
+    async def call(self, tool: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        result = await self.session.call_tool(tool, arguments, read_timeout_seconds=self.timeout)
+        if result.structuredContent is not None:
+            payload = result.structuredContent.get("result", result.structuredContent)
+        else:
+            payload = json.loads(result.content[0].text) if result.content else {}
+        if result.isError:
+            return {"success": False, "error": str(payload)}
+        return payload
+
+    async def setup(self) -> None:
+        args = self.args
+        if args.recreate:
+            await self.call("delete_collection", {"name": args.collection})
+        created = await self.call("create_collection", {
+            "name": args.collection,
+            "vector_size": self.workload.embedder.dimension,
+            "multitenant": True
+        })
+        if not created.get("success") and "already exists" not in str(created.get("error", "")):
+            raise RuntimeError(f"Could not create collection: {created.get('error')}")
+
+        preload = asyncio.Semaphore(args.preload_concurrency)
+
+        async def ingest_base(business_id: str) -> None:
+            async with preload:
+                await self.call("ingest_documents", {
+                    "collection_name": args.collection,
+                    "business_id": business_id,
+                    "documents": [self.workload.document(business_id)]
+                })
+
+        started = time.perf_counter()
+        await asyncio.gather(*(ingest_base(business_id) for business_id in self.workload.business_ids))
+        print(
+            f"Preloaded {len(self.workload.business_ids)} businesses in {time.perf_counter() - started:.1f}s",
+            file=sys.stderr
+        )
+
+    async def search(self) -> dict[str, Any]:
+        business_id = self.workload.pick_business()
+        question = self.workload.question()
+        vector = self.workload.embedder.embed_one(question)
+        result = await self.call("search_points", {
+            "collection_name": self.args.collection,
+            "business_id": business_id,
+            "query_vector": encode_vector(vector, "float32"),
+            "vector_encoding": "float32",
+            "limit": self.args.search_limit,
+            "include_fields": ["text", "source"]
+        })
+        if result.get("success"):
+            # Prompt assembly, as the RAG pipeline does before calling the LLM
+            context = "\n\n".join(point["payload"].get("text", "") for point in result["results"])
+            result["prompt_chars"] = len(f"Context:\n{context}\n\nQuestion: {question}")
+        return result
+
+    async def ingest(self) -> dict[str, Any]:
+        business_id = self.workload.pick_business()
+        document = self.workload.document(business_id)
+        result = await self.call("ingest_documents", {
+            "collection_name": self.args.collection,
+            "business_id": business_id,
+            "documents": [document]
+        })
+        if result.get("success"):
+            self.workload.extra_documents.setdefault(business_id, []).append(document["source"])
+        return result
+
+    async def delete(self) -> dict[str, Any]:
+        candidates = [business_id for business_id, sources in self.workload.extra_documents.items() if sources]
+        if candidates:
+            business_id = candidates[int(self.workload.rng.integers(len(candidates)))]
+            source = self.workload.extra_documents[business_id].pop(0)
+        else:
+            # Nothing ingested yet: still a scoped delete round trip, matching nothing
+            business_id, source = self.workload.pick_business(), "missing.txt"
+        return await self.call("delete_points", {
+            "collection_name": self.args.collection,
+            "business_id": business_id,
+            "filters": {"source": source}
+        })
+
+    async def issue(self, step: Step, operation: str, intended: float) -> None:
+        loop = asyncio.get_running_loop()
+        if self.slots is not None:
+            await self.slots.acquire()
+        sent = loop.time()
+        step.max_send_lag_ms = max(step.max_send_lag_ms, (sent - intended) * 1000)
+        step.in_flight += 1
+        step.max_in_flight = max(step.max_in_flight, step.in_flight)
+        try:
+            result = await getattr(self, operation)()
+            failed = not result.get("success", False)
+        except Exception as e:
+            failed = True
+            if "timed out" in str(e).lower():
+                step.timeouts += 1
+        finally:
+            step.in_flight -= 1
+            if self.slots is not None:
+                self.slots.release()
+        done = loop.time()
+        step.completed += 1
+        step.response_ms[operation].append((done - intended) * 1000)
+        step.service_ms[operation].append((done - sent) * 1000)
+        if failed:
+            step.errors[operation] += 1
+
+    async def run_step(self, rate: float) -> dict[str, Any]:
+        """Offer Poisson arrivals at rate/s for --step-seconds, then drain"""
+        loop = asyncio.get_running_loop()
+        step = Step(rate)
+        names = list(self.args.mix)
+        weights = [self.args.mix[name] for name in names]
+        tasks = []
+        start = loop.time()
+        arrival = 0.0
+        while True:
+            arrival += self.workload.rng.exponential(1.0 / rate)
+            if arrival >= self.args.step_seconds:
+                break
+            intended = start + arrival
+            delay = intended - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            operation = names[self.workload.rng.choice(len(names), p=weights)]
+            step.scheduled += 1
+            tasks.append(asyncio.ensure_future(self.issue(step, operation, intended)))
+        await asyncio.gather(*tasks)
+        duration = max(loop.time() - start, self.args.step_seconds)
+        return step.summary(self.args.step_seconds, duration)
+
+    def saturated(self, summary: dict[str, Any]) -> Optional[str]:
+        """Why a step missed its targets, or None if it kept up"""
+        # Compared with the arrivals actually drawn, not the nominal rate, so
+        # Poisson variance in short steps is not mistaken for saturation
+        if summary["achieved_rps"] < summary["scheduled_rps"] * self.args.min_throughput_ratio:
+            return "throughput"
+        if summary["response_ms"].get("p99", 0) > self.args.slo_p99_ms:
+            return "p99"
+        if summary["error_rate"] > self.args.max_error_rate:
+            return "errors"
+        return None
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    env = dict(os.environ)
+    if args.backend == "numpy":
+        env["QDRANT_BACKEND"] = "numpy"
+    env.setdefault("EMBEDDING_DIM", str(args.dim))
+    # Ingested documents are embedded server-side like the questions here
+    env.setdefault("EMBEDDER_BACKEND", "hash")
+    # Admission control paces hot businesses, which would read as saturation
+    env["QDRANT_SCHEDULER"] = "true" if args.admission else "false"
+    server = StdioServerParameters(command=sys.executable, args=[SERVER_PATH], env=env, cwd=os.path.dirname(SERVER_PATH))
+
+    with open(args.server_log, "a") as errlog:
+        async with stdio_client(server, errlog=errlog) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                workload = Workload(args.businesses, args.skew, args.dim, args.seed)
+                generator = LoadGenerator(session, workload, args)
+                await generator.setup()
+
+                steps = []
+                saturation = None
+                for rate in args.rates:
+                    summary = await generator.run_step(rate)
+                    reason = generator.saturated(summary)
+                    summary["saturated"] = reason
+                    steps.append(summary)
+                    print(
+                        f"{rate:>8.1f}/s offered  {summary['achieved_rps']:>8.1f}/s achieved  "
+                        f"p99 {summary['response_ms'].get('p99', 0):>9.1f} ms  "
+                        f"errors {summary['errors']}{'  SATURATED (' + reason + ')' if reason else ''}",
+                        file=sys.stderr
+                    )
+                    if reason:
+                        saturation = rate
+                        if not args.continue_after_saturation:
+                            break
+
+                server_metrics = await generator.call("get_server_metrics", {})
+
+    sustainable = [step["offered_rps"] for step in steps if not step["saturated"]]
+    return {
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "backend", "businesses", "skew", "dim", "rates", "step_seconds", "mix",
+                "search_limit", "max_in_flight", "admission", "timeout", "slo_p99_ms", "seed"
+            )
+        },
+        "steps": steps,
+        "max_sustainable_rps": max(sustainable) if sustainable else None,
+        "saturated_at_rps": saturation,
+        "server_metrics": server_metrics
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Open-loop RAG load generator for the Qdrant MCP server")
+    parser.add_argument("--backend", choices=("numpy", "qdrant"), default="numpy",
+                        help="numpy: in-process store in the server; qdrant: QDRANT_URL / QDRANT_CONFIG_FILE")
+    parser.add_argument("--collection", default="mcp_loadgen")
+    parser.add_argument("--recreate", action="store_true", help="drop the collection before preloading")
+    parser.add_argument("--businesses", type=int, default=1000)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of business popularity")
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--rates", type=lambda v: [float(r) for r in v.split(",")], default=[10, 25, 50, 100, 200],
+                        help="comma-separated offered loads in requests/s")
+    parser.add_argument("--step-seconds", type=float, default=30.0)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("search=0.85,ingest=0.1,delete=0.05"))
+    parser.add_argument("--search-limit", type=int, default=5)
+    parser.add_argument("--max-in-flight", type=int, default=0, help="client-side cap (0 = unbounded)")
+    parser.add_argument("--admission", action="store_true", help="run the server with per-tenant admission control")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--preload-concurrency", type=int, default=16)
+    parser.add_argument("--slo-p99-ms", type=float, default=500.0)
+    parser.add_argument("--min-throughput-ratio", type=float, default=0.95)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--continue-after-saturation", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--server-log", default=os.devnull, help="file receiving the server's stderr")
+    parser.add_argument("--output", help="write the JSON report to this file as well")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
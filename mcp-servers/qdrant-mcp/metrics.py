@@ -0,0 +1,434 @@
+"""
+Per-tool instrumentation for the MCP server
+
+Every tool call is timed end to end and split into phases:
+- admission: delay imposed by per-tenant admission control (recorded only
+  when the scheduler's admission is on; see record_admission_wait)
+- decode: from the start of the call to its first Qdrant request (FastMCP
+  argument validation, vector decoding, PointStruct construction), not
+  counting admission
+- qdrant: time spent in Qdrant requests (measured by server.qdrant_slot),
+  with time waiting for a free slot reported separately as qdrant_wait
+- encode: FastMCP converting the result to response content
+
+decode and encode cover FastMCP's own work only when the tool manager is
+attached (attach()); tools called directly from Python record neither
+validation nor encode. Nothing is serialized for the metrics themselves:
+the response size is the length of the text FastMCP produced, and request
+sizes (and responses of direct calls) are estimated from a sample of the
+arguments (estimate_json_bytes). Metrics are labelled by tool and
+collection and are available as a JSON snapshot (get_server_metrics) and
+in Prometheus text format, optionally written to a file for the
+node_exporter textfile collector.
+"""
+
+import asyncio
+import functools
+import inspect
+import itertools
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger("qdrant-mcp")
+
+# Bucket upper bounds; the sub-millisecond ones resolve decode/encode/wait
+# phases that are typically tens of microseconds
+LATENCY_BUCKETS_MS = (
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000
+)
+SIZE_BUCKETS_BYTES = tuple(256 * 4 ** i for i in range(9))  # 256 B .. 16 MiB
+PHASES = ("total", "admission", "decode", "qdrant_wait", "qdrant", "encode")
+
+# Result keys that hold the number of items a tool returned or wrote
+COUNT_KEYS = ("count", "points_count", "chunks_count", "deleted_count")
+
+# Items of a list or dict measured by estimate_json_bytes before extrapolating
+SIZE_SAMPLE = 8
+
+def estimate_json_bytes(value: Any) -> int:
+    """
+    Approximate compact JSON size of a value without serializing it
+
+    Lists and dicts longer than SIZE_SAMPLE are extrapolated from evenly
+    spaced items, so the cost depends on the nesting depth, not on how
+    many points or vector components a request carries.
+    """
+    if isinstance(value, str):
+        return len(value) + 2
+    if value is None or isinstance(value, bool):
+        return 4
+    if isinstance(value, (int, float)):
+        return len(repr(value))
+    if isinstance(value, dict):
+        items = len(value)
+        if not items:
+            return 2
+        sample = list(itertools.islice(value.items(), SIZE_SAMPLE))
+        measured = sum(len(str(key)) + 4 + estimate_json_bytes(item) for key, item in sample)
+        return 1 + round(measured * items / len(sample))
+    if isinstance(value, (list, tuple)):
+        items = len(value)
+        if not items:
+            return 2
+        sample = value if items <= SIZE_SAMPLE else value[::items // SIZE_SAMPLE][:SIZE_SAMPLE]
+        measured = sum(estimate_json_bytes(item) + 1 for item in sample)
+        return 1 + round(measured * items / len(sample))
+    return len(str(value)) + 2
+
+def _content_chars(content: Any) -> int:
+    """Length of the text blocks FastMCP produced for a tool result"""
+    if isinstance(content, tuple):
+        content = content[0]
+    return sum(len(block.text) for block in content if isinstance(getattr(block, "text", None), str))
+
+class Histogram:
+    """Cumulative-bucket histogram, Prometheus style"""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating inside its bucket, clamped to the observed range"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = max(self.buckets[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(self.buckets[i] if i < len(self.buckets) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def summary(self) -> dict[str, Any]:
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 3),
+            "max": round(self.max, 3),
+            "p50": round(self.quantile(0.5), 3),
+            "p95": round(self.quantile(0.95), 3),
+            "p99": round(self.quantile(0.99), 3)
+        }
+
+class _CallStats:
+    """Phase timings and outcome of one in-flight tool call"""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.collection = ""
+        self.started = time.perf_counter()
+        self.entered = False
+        self.admission_ms: Optional[float] = None
+        self.first_qdrant: Optional[float] = None
+        self.qdrant_ms = 0.0
+        self.qdrant_wait_ms = 0.0
+        self.ended: Optional[float] = None
+        self.result: Any = None
+        self.error_type: Optional[str] = None
+        self.finished = False
+
+    def finish(self, result: Any, error_type: Optional[str]) -> None:
+        self.ended = time.perf_counter()
+        self.result = result
+        self.error_type = error_type
+        self.finished = True
+
+_current_call: ContextVar[Optional[_CallStats]] = ContextVar("qdrant_mcp_call", default=None)
+
+def record_admission_wait(waited_ms: float) -> None:
+    """Attribute admission-control delay to the current tool call (called by the scheduler)"""
+    call = _current_call.get()
+    if call is not None and not call.finished:
+        call.admission_ms = (call.admission_ms or 0.0) + waited_ms
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class ServerMetrics:
+    """
+    Tool-call metrics registry
+
+    Args:
+        enabled: Instrument tool calls (False makes instrument() a passthrough)
+        prometheus_file: Path to write Prometheus text format to (None: off)
+        write_interval: Seconds between Prometheus file writes
+    """
+
+    def __init__(self, enabled: bool = True, prometheus_file: Optional[str] = None, write_interval: float = 15.0):
+        self.enabled = enabled
+        self.prometheus_file = prometheus_file
+        self.write_interval = write_interval
+        self.started_at = time.time()
+        # (tool, collection, phase) -> latency histogram in ms
+        self.latency: dict[tuple[str, str, str], Histogram] = {}
+        # (tool, collection, "request"|"response") -> size histogram in bytes
+        self.sizes: dict[tuple[str, str, str], Histogram] = {}
+        # (tool, collection) -> [result count sum, calls with a count]
+        self.results: dict[tuple[str, str], list[int]] = {}
+        self.calls: dict[tuple[str, str], int] = {}
+        # (tool, collection, error type) -> count
+        self.errors: dict[tuple[str, str, str], int] = {}
+        self._writer: Optional[asyncio.Task] = None
+
+    # Qdrant phase, reported by server.qdrant_slot
+
+    def qdrant_request_started(self, waited_ms: float) -> Optional[float]:
+        call = _current_call.get()
+        if call is None or call.finished:
+            return None
+        now = time.perf_counter()
+        if call.first_qdrant is None:
+            call.first_qdrant = now - waited_ms / 1000
+        call.qdrant_wait_ms += waited_ms
+        return now
+
+    def qdrant_request_finished(self, started: Optional[float]) -> None:
+        call = _current_call.get()
+        if started is None or call is None or call.finished:
+            return
+        call.qdrant_ms += (time.perf_counter() - started) * 1000
+
+    # Tool wrappers
+
+    def attach(self, tool_manager: Any) -> None:
+        """
+        Also time FastMCP's argument validation and result conversion
+
+        Wraps the FastMCP tool manager's call_tool. Calls arriving through
+        MCP are then recorded here, after the result has been converted,
+        and the response size is taken from the converted content.
+        """
+        call_tool = tool_manager.call_tool
+
+        @functools.wraps(call_tool)
+        async def wrapper(name: str, arguments: dict[str, Any], *args: Any, **kwargs: Any) -> Any:
+            if not self.enabled:
+                return await call_tool(name, arguments, *args, **kwargs)
+            call = _CallStats(name)
+            token = _current_call.set(call)
+            content = None
+            try:
+                content = await call_tool(name, arguments, *args, **kwargs)
+                return content
+            finally:
+                _current_call.reset(token)
+                # Unknown tools and invalid arguments never reach instrument(),
+                # cancelled calls never finish
+                if call.finished:
+                    self._record(call, arguments, content)
+
+        tool_manager.call_tool = wrapper
+
+    def instrument(self, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Wrap a tool coroutine; the signature is preserved for FastMCP"""
+        tool = fn.__name__
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not self.enabled:
+                return await fn(*args, **kwargs)
+            self._ensure_writer()
+            if args:
+                # Direct Python callers (benchmark.py) may pass arguments positionally
+                kwargs = {**signature.bind_partial(*args).arguments, **kwargs}
+                args = ()
+            call = _current_call.get()
+            token = None
+            if call is None or call.entered or call.tool != tool:
+                # Called directly rather than through the attached tool manager
+                call = _CallStats(tool)
+                token = _current_call.set(call)
+            call.entered = True
+            call.collection = str(kwargs.get("collection_name", kwargs.get("name", "")) or "")
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                call.finish(None, type(e).__name__)
+                if token is not None:
+                    self._record(call, kwargs)
+                raise
+            finally:
+                if token is not None:
+                    _current_call.reset(token)
+
+            error_type = None
+            if isinstance(result, dict) and (result.get("success") is False or "error" in result):
+                error_type = result.get("error_type", "ToolError")
+            call.finish(result, error_type)
+            if token is not None:
+                self._record(call, kwargs)
+            return result
+
+        return wrapper
+
+    def _histogram(self, registry: dict, key: tuple, buckets: tuple[float, ...]) -> Histogram:
+        histogram = registry.get(key)
+        if histogram is None:
+            histogram = registry[key] = Histogram(buckets)
+        return histogram
+
+    def _record(self, call: _CallStats, arguments: dict[str, Any], content: Any = None) -> None:
+        """Record a finished call; content is FastMCP's converted result, if attached"""
+        now = time.perf_counter()
+        tool, collection, result, error_type = call.tool, call.collection, call.result, call.error_type
+        request_bytes = estimate_json_bytes({k: v for k, v in arguments.items() if k != "ctx"})
+        response_bytes = None
+        if content is not None:
+            response_bytes = _content_chars(content)
+        elif result is not None:
+            response_bytes = estimate_json_bytes(result)
+
+        decode_end = call.first_qdrant if call.first_qdrant is not None else call.ended
+        phases = {
+            "total": (now - call.started) * 1000,
+            "decode": (decode_end - call.started) * 1000 - (call.admission_ms or 0.0),
+            "qdrant_wait": call.qdrant_wait_ms,
+            "qdrant": call.qdrant_ms
+        }
+        if call.admission_ms is not None:
+            phases["admission"] = call.admission_ms
+        if content is not None:
+            phases["encode"] = (now - call.ended) * 1000
+        for phase, value in phases.items():
+            self._histogram(self.latency, (tool, collection, phase), LATENCY_BUCKETS_MS).observe(value)
+        self._histogram(self.sizes, (tool, collection, "request"), SIZE_BUCKETS_BYTES).observe(request_bytes)
+        if response_bytes is not None:
+            self._histogram(self.sizes, (tool, collection, "response"), SIZE_BUCKETS_BYTES).observe(response_bytes)
+
+        key = (tool, collection)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        if isinstance(result, dict):
+            for count_key in COUNT_KEYS:
+                if isinstance(result.get(count_key), int):
+                    totals = self.results.setdefault(key, [0, 0])
+                    totals[0] += result[count_key]
+                    totals[1] += 1
+                    break
+        if error_type is not None:
+            error_key = (tool, collection, error_type)
+            self.errors[error_key] = self.errors.get(error_key, 0) + 1
+
+    # Export
+
+    def snapshot(self) -> dict[str, Any]:
+        """Per-tool, per-collection summary (latencies in ms, sizes in bytes)"""
+        tools: dict[str, dict[str, Any]] = {}
+        for (tool, collection), calls in sorted(self.calls.items()):
+            entry = tools.setdefault(tool, {})[collection or "-"] = {
+                "calls": calls,
+                "latency_ms": {
+                    phase: self.latency[(tool, collection, phase)].summary()
+                    for phase in PHASES
+                    if (tool, collection, phase) in self.latency
+                },
+                "request_bytes": self.sizes[(tool, collection, "request")].summary(),
+            }
+            if (tool, collection, "response") in self.sizes:
+                entry["response_bytes"] = self.sizes[(tool, collection, "response")].summary()
+            if (tool, collection) in self.results:
+                total, counted = self.results[(tool, collection)]
+                entry["results"] = {"total": total, "mean": round(total / counted, 2)}
+            errors = {
+                error_type: count
+                for (t, c, error_type), count in self.errors.items()
+                if (t, c) == (tool, collection)
+            }
+            if errors:
+                entry["errors"] = errors
+        return {
+            "enabled": self.enabled,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "tools": tools
+        }
+
+    def prometheus_text(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        lines: list[str] = []
+
+        def histogram_lines(name: str, key_labels: str, histogram: Histogram, scale: float) -> None:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{key_labels},le="{bound * scale:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{key_labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{key_labels}}} {histogram.sum * scale:g}")
+            lines.append(f"{name}_count{{{key_labels}}} {histogram.count}")
+
+        lines.append("# HELP qdrant_mcp_tool_calls_total Tool calls")
+        lines.append("# TYPE qdrant_mcp_tool_calls_total counter")
+        for (tool, collection), calls in sorted(self.calls.items()):
+            lines.append(f'qdrant_mcp_tool_calls_total{{tool="{tool}",collection="{_label(collection)}"}} {calls}')
+
+        lines.append("# HELP qdrant_mcp_tool_errors_total Failed tool calls by error type")
+        lines.append("# TYPE qdrant_mcp_tool_errors_total counter")
+        for (tool, collection, error_type), count in sorted(self.errors.items()):
+            lines.append(
+                f'qdrant_mcp_tool_errors_total{{tool="{tool}",collection="{_label(collection)}",'
+                f'type="{_label(error_type)}"}} {count}'
+            )
+
+        lines.append("# HELP qdrant_mcp_tool_duration_seconds Tool latency by phase")
+        lines.append("# TYPE qdrant_mcp_tool_duration_seconds histogram")
+        for (tool, collection, phase), histogram in sorted(self.latency.items()):
+            labels = f'tool="{tool}",collection="{_label(collection)}",phase="{phase}"'
+            histogram_lines("qdrant_mcp_tool_duration_seconds", labels, histogram, 0.001)
+
+        lines.append("# HELP qdrant_mcp_tool_payload_bytes JSON size of tool requests and responses")
+        lines.append("# TYPE qdrant_mcp_tool_payload_bytes histogram")
+        for (tool, collection, direction), histogram in sorted(self.sizes.items()):
+            labels = f'tool="{tool}",collection="{_label(collection)}",direction="{direction}"'
+            histogram_lines("qdrant_mcp_tool_payload_bytes", labels, histogram, 1)
+
+        lines.append("# HELP qdrant_mcp_tool_results Items returned or written per call")
+        lines.append("# TYPE qdrant_mcp_tool_results summary")
+        for (tool, collection), (total, counted) in sorted(self.results.items()):
+            labels = f'tool="{tool}",collection="{_label(collection)}"'
+            lines.append(f"qdrant_mcp_tool_results_sum{{{labels}}} {total}")
+            lines.append(f"qdrant_mcp_tool_results_count{{{labels}}} {counted}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self) -> None:
+        """Atomically replace the Prometheus text file"""
+        if not self.prometheus_file:
+            return
+        tmp_path = f"{self.prometheus_file}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, self.prometheus_file)
+
+    def _ensure_writer(self) -> None:
+        if not self.prometheus_file or (self._writer is not None and not self._writer.done()):
+            return
+        self._writer = asyncio.ensure_future(self._write_loop())
+
+    async def _write_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.write_interval)
+            try:
+                self.write_prometheus()
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {self.prometheus_file}: {e}")
@@ -0,0 +1,728 @@
+"""
+In-process NumPy vector store
+
+Implements the subset of the AsyncQdrantClient interface used by server.py,
+so the MCP tools run unchanged against it (QDRANT_BACKEND=numpy). Intended
+for edge deployments, hermetic tests and benchmarks.
+
+Each collection keeps one contiguous float32 matrix per business_id, so a
+tenant-scoped search is a single matrix-vector product over that tenant's
+rows followed by argpartition for the top-k. With a storage path, tenant
+matrices are persisted as raw float32 files (ids and payloads as JSON) and
+memory-mapped copy-on-write when loaded; writes are flushed shortly after
+they happen, and at the latest when the interpreter exits (atexit), since
+the MCP server is usually stopped without closing its client.
+
+Not supported: sparse vectors / hybrid queries, sharding (shard keys are
+accepted and ignored, tenants are already stored separately), and filter
+conditions other than match / match-any / has-id.
+"""
+
+import asyncio
+import atexit
+import bisect
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Callable, Iterator, Optional, Union
+
+import numpy as np
+from qdrant_client.http import models
+
+from collection_config import TENANT_FIELD
+
+SUPPORTED_DISTANCES = (models.Distance.COSINE, models.Distance.DOT, models.Distance.EUCLID)
+
+PointId = Union[int, str]
+
+def normalize_id(point_id: Any) -> PointId:
+    """Qdrant IDs are unsigned ints or UUIDs; UUIDs are returned in canonical form"""
+    if isinstance(point_id, int) and not isinstance(point_id, bool) and point_id >= 0:
+        return point_id
+    try:
+        return str(uuid.UUID(str(point_id)))
+    except ValueError:
+        raise ValueError(f"Invalid point ID '{point_id}': expected an unsigned integer or a UUID")
+
+def _id_order(point_id: PointId) -> tuple[int, Any]:
+    # Scroll order: numeric IDs first, then UUIDs
+    return (0, point_id) if isinstance(point_id, int) else (1, point_id)
+
+def _payload_value(payload: dict[str, Any], key: str) -> Any:
+    value: Any = payload
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+RowPredicate = Callable[[PointId, dict[str, Any]], bool]
+
+def _compile_condition(condition: Any) -> RowPredicate:
+    if isinstance(condition, models.Filter):
+        return compile_filter(condition)
+    if isinstance(condition, models.HasIdCondition):
+        point_ids = {normalize_id(value) for value in condition.has_id}
+        return lambda point_id, payload: point_id in point_ids
+    if isinstance(condition, models.FieldCondition) and isinstance(condition.match, models.MatchValue):
+        key, expected = condition.key, condition.match.value
+
+        def match_value(point_id: PointId, payload: dict[str, Any]) -> bool:
+            value = _payload_value(payload, key)
+            return expected in value if isinstance(value, list) else expected == value
+
+        return match_value
+    if isinstance(condition, models.FieldCondition) and isinstance(condition.match, models.MatchAny):
+        key, accepted = condition.key, condition.match.any
+
+        def match_any(point_id: PointId, payload: dict[str, Any]) -> bool:
+            value = _payload_value(payload, key)
+            return any(v in accepted for v in (value if isinstance(value, list) else [value]))
+
+        return match_any
+    raise ValueError(f"Unsupported filter condition for the numpy backend: {condition!r}")
+
+def compile_filter(query_filter: Optional[models.Filter]) -> RowPredicate:
+    """
+    Row predicate for a filter
+
+    Built once per query and applied to every candidate row, so per-filter
+    work (ID normalization, condition dispatch) is not repeated per row.
+    """
+    if query_filter is None:
+        return lambda point_id, payload: True
+
+    def as_list(conditions: Any) -> list[RowPredicate]:
+        if conditions is None:
+            return []
+        return [_compile_condition(c) for c in (conditions if isinstance(conditions, list) else [conditions])]
+
+    must, should, must_not = as_list(query_filter.must), as_list(query_filter.should), as_list(query_filter.must_not)
+
+    def matches(point_id: PointId, payload: dict[str, Any]) -> bool:
+        if not all(c(point_id, payload) for c in must):
+            return False
+        if should and not any(c(point_id, payload) for c in should):
+            return False
+        return not any(c(point_id, payload) for c in must_not)
+
+    return matches
+
+def _filter_tenants(query_filter: Optional[models.Filter]) -> Optional[list[str]]:
+    """Business IDs a filter is restricted to by its must clause (None: unrestricted)"""
+    if query_filter is None or query_filter.must is None:
+        return None
+    must = query_filter.must if isinstance(query_filter.must, list) else [query_filter.must]
+    for condition in must:
+        if isinstance(condition, models.FieldCondition) and condition.key == TENANT_FIELD:
+            if isinstance(condition.match, models.MatchValue):
+                return [condition.match.value]
+            if isinstance(condition.match, models.MatchAny):
+                return list(condition.match.any)
+    return None
+
+def _residual_filter(query_filter: Optional[models.Filter]) -> Optional[models.Filter]:
+    """
+    The filter minus its tenant condition
+
+    Once the search is narrowed to the tenant's own segments the business_id
+    condition holds for every row, and a filter with nothing else left needs
+    no per-row evaluation at all.
+    """
+    if _filter_tenants(query_filter) is None:
+        return query_filter
+    must = query_filter.must if isinstance(query_filter.must, list) else [query_filter.must]
+    rest = [c for c in must if not (isinstance(c, models.FieldCondition) and c.key == TENANT_FIELD)]
+    if not rest and not query_filter.should and not query_filter.must_not:
+        return None
+    return models.Filter(must=rest, should=query_filter.should, must_not=query_filter.must_not)
+
+def _include_payload(payload: dict[str, Any], keys: list[str]) -> dict[str, Any]:
+    """Keep the given (possibly dotted) keys, nested as in the payload"""
+    selected: dict[str, Any] = {}
+    for key in keys:
+        *parents, leaf = key.split(".")
+        source: Any = payload
+        for part in parents:
+            source = source.get(part) if isinstance(source, dict) else None
+        if not isinstance(source, dict) or leaf not in source:
+            continue
+        target = selected
+        for part in parents:
+            if not isinstance(target.get(part), dict):
+                target[part] = {}
+            target = target[part]
+        target[leaf] = source[leaf]
+    return selected
+
+def _exclude_payload(payload: dict[str, Any], keys: list[str]) -> dict[str, Any]:
+    """Drop the given (possibly dotted) keys, copying only the dicts on their path"""
+    selected = dict(payload)
+    for key in keys:
+        *parents, leaf = key.split(".")
+        target = selected
+        for part in parents:
+            if not isinstance(target.get(part), dict):
+                break
+            target[part] = dict(target[part])
+            target = target[part]
+        else:
+            target.pop(leaf, None)
+    return selected
+
+def select_payload(payload: dict[str, Any], with_payload: Any) -> Optional[dict[str, Any]]:
+    if with_payload is None or with_payload is False:
+        return None
+    if with_payload is True:
+        return dict(payload)
+    if isinstance(with_payload, list):
+        return _include_payload(payload, with_payload)
+    if isinstance(with_payload, models.PayloadSelectorInclude):
+        return _include_payload(payload, with_payload.include)
+    if isinstance(with_payload, models.PayloadSelectorExclude):
+        return _exclude_payload(payload, with_payload.exclude)
+    raise ValueError(f"Unsupported payload selector: {with_payload!r}")
+
+def _dense_vector(vector: Any) -> Any:
+    if isinstance(vector, dict):
+        if set(vector) - {""}:
+            raise ValueError("The numpy backend only stores the unnamed dense vector")
+        return vector[""]
+    return vector
+
+class TenantSegment:
+    """
+    Contiguous float32 rows of one tenant
+
+    Rows are kept dense: removing a point moves the last row into its slot.
+    Capacity grows geometrically so appends are amortized O(dimension).
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        vectors: Optional[np.ndarray] = None,
+        ids: Optional[list[PointId]] = None,
+        payloads: Optional[list[dict[str, Any]]] = None
+    ):
+        self.dimension = dimension
+        self.ids: list[PointId] = ids or []
+        self.payloads: list[dict[str, Any]] = payloads or []
+        self.vectors = vectors if vectors is not None else np.empty((16, dimension), dtype=np.float32)
+        self.rows = {point_id: row for row, point_id in enumerate(self.ids)}
+        # Scroll order of the IDs, rebuilt lazily after inserts and removals
+        self._order: Optional[list[tuple[int, Any]]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self.vectors[:len(self.ids)]
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes
+
+    def upsert(self, point_id: PointId, vector: np.ndarray, payload: dict[str, Any]) -> None:
+        row = self.rows.get(point_id)
+        if row is None:
+            row = len(self.ids)
+            if row >= len(self.vectors):
+                grown = np.empty((max(16, 2 * len(self.vectors)), self.dimension), dtype=np.float32)
+                grown[:row] = self.vectors[:row]
+                self.vectors = grown
+            self.ids.append(point_id)
+            self.payloads.append(payload)
+            self.rows[point_id] = row
+            self._order = None
+        else:
+            self.payloads[row] = payload
+        self.vectors[row] = vector
+
+    def remove(self, point_id: PointId) -> bool:
+        row = self.rows.pop(point_id, None)
+        if row is None:
+            return False
+        last = len(self.ids) - 1
+        if row != last:
+            # Copy-on-write memmaps accept this write without touching the file
+            self.vectors[row] = self.vectors[last]
+            self.ids[row] = self.ids[last]
+            self.payloads[row] = self.payloads[last]
+            self.rows[self.ids[row]] = row
+        self.ids.pop()
+        self.payloads.pop()
+        self._order = None
+        return True
+
+    def ordered_from(self, start: Optional[tuple[int, Any]] = None) -> Iterator[tuple[int, Any]]:
+        """Scroll-order keys of the IDs, from start (inclusive) on"""
+        if self._order is None:
+            self._order = sorted(_id_order(point_id) for point_id in self.ids)
+        order = self._order
+        first = bisect.bisect_left(order, start) if start is not None else 0
+        return (order[i] for i in range(first, len(order)))
+
+    def top_k(
+        self,
+        query: np.ndarray,
+        limit: int,
+        distance: models.Distance,
+        mask: Optional[np.ndarray] = None,
+        score_threshold: Optional[float] = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Brute-force nearest rows
+
+        Returns:
+            (rows, scores) best first; for Euclid the score is the distance
+        """
+        matrix = self.matrix
+        if len(matrix) == 0 or limit <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if distance == models.Distance.EUCLID:
+            sq_dist = np.einsum("ij,ij->i", matrix, matrix) - 2 * (matrix @ query) + query @ query
+            scores = np.sqrt(np.maximum(sq_dist, 0))
+            keys = -scores
+        else:
+            scores = matrix @ query
+            keys = scores.copy()
+        if mask is not None:
+            keys[~mask] = -np.inf
+        if score_threshold is not None:
+            passing = scores <= score_threshold if distance == models.Distance.EUCLID else scores >= score_threshold
+            keys[~passing] = -np.inf
+
+        k = min(limit, len(keys))
+        rows = np.argpartition(-keys, k - 1)[:k] if k < len(keys) else np.arange(len(keys))
+        rows = rows[np.argsort(-keys[rows], kind="stable")]
+        rows = rows[np.isfinite(keys[rows])]
+        return rows, scores[rows]
+
+class _Collection:
+    def __init__(self, name: str, dimension: int, distance: models.Distance):
+        self.name = name
+        self.dimension = dimension
+        self.distance = distance
+        self.segments: dict[Optional[str], TenantSegment] = {}
+        # point ID -> business_id of the segment holding it
+        self.owners: dict[PointId, Optional[str]] = {}
+        self.dirty: set[Optional[str]] = set()
+
+    def prepare(self, vector: Any) -> np.ndarray:
+        array = np.asarray(_dense_vector(vector), dtype=np.float32)
+        if array.shape != (self.dimension,):
+            raise ValueError(
+                f"Vector dimension error: expected dim: {self.dimension}, got {array.shape[-1] if array.ndim else 0}"
+            )
+        if self.distance == models.Distance.COSINE:
+            norm = np.linalg.norm(array)
+            if norm > 0:
+                array = array / norm
+        return array
+
+    def tenant_segments(self, query_filter: Optional[models.Filter]) -> list[TenantSegment]:
+        tenants = _filter_tenants(query_filter)
+        if tenants is None:
+            return list(self.segments.values())
+        return [self.segments[t] for t in tenants if t in self.segments]
+
+    def matching(self, query_filter: Optional[models.Filter]) -> list[tuple[TenantSegment, int]]:
+        matches = compile_filter(_residual_filter(query_filter))
+        return [
+            (segment, row)
+            for segment in self.tenant_segments(query_filter)
+            for row, point_id in enumerate(segment.ids)
+            if matches(point_id, segment.payloads[row])
+        ]
+
+    def remove(self, point_id: PointId) -> bool:
+        if point_id not in self.owners:
+            return False
+        tenant = self.owners.pop(point_id)
+        self.segments[tenant].remove(point_id)
+        self.dirty.add(tenant)
+        return True
+
+class NumpyVectorStore:
+    """
+    AsyncQdrantClient-compatible in-process store
+
+    Args:
+        path: Directory to persist collections in (None: memory only)
+        flush_delay: Seconds to batch writes before flushing them to disk
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_delay: float = 1.0):
+        self.path = path
+        self.flush_delay = flush_delay
+        self._collections: dict[str, _Collection] = {}
+        self._operation_id = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        if path:
+            os.makedirs(path, exist_ok=True)
+            for name in sorted(os.listdir(path)):
+                if os.path.exists(os.path.join(path, name, "collection.json")):
+                    self._collections[name] = self._load_collection(name)
+            # Writes acknowledged within the last flush_delay must survive shutdown
+            atexit.register(self.flush)
+
+    # Persistence
+
+    def _collection_dir(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @staticmethod
+    def _segment_stem(tenant: Optional[str]) -> str:
+        return hashlib.sha1(json.dumps(tenant).encode()).hexdigest()[:16]
+
+    def _load_collection(self, name: str) -> _Collection:
+        directory = self._collection_dir(name)
+        with open(os.path.join(directory, "collection.json")) as f:
+            meta = json.load(f)
+        collection = _Collection(name, meta["dimension"], models.Distance(meta["distance"]))
+        for stem, tenant in meta["tenants"].items():
+            with open(os.path.join(directory, f"{stem}.json")) as f:
+                rows = json.load(f)
+            ids = [normalize_id(point_id) for point_id in rows["ids"]]
+            if ids:
+                vectors = np.memmap(
+                    os.path.join(directory, f"{stem}.f32"),
+                    dtype=np.float32,
+                    mode="c",
+                    shape=(len(ids), collection.dimension)
+                )
+            else:
+                vectors = None
+            collection.segments[tenant] = TenantSegment(collection.dimension, vectors, ids, rows["payloads"])
+            for point_id in ids:
+                collection.owners[point_id] = tenant
+        return collection
+
+    @staticmethod
+    def _replace(path: str, write: Any) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def flush(self) -> None:
+        """Write dirty tenant segments and collection metadata to disk"""
+        self._flush_handle = None
+        if not self.path:
+            return
+        for collection in self._collections.values():
+            if not collection.dirty:
+                continue
+            directory = self._collection_dir(collection.name)
+            os.makedirs(directory, exist_ok=True)
+            for tenant in collection.dirty:
+                stem = self._segment_stem(tenant)
+                segment = collection.segments.get(tenant)
+                if segment is None:
+                    continue
+                self._replace(os.path.join(directory, f"{stem}.f32"), lambda f: f.write(segment.matrix.tobytes()))
+                rows = {"ids": segment.ids, "payloads": segment.payloads}
+                self._replace(os.path.join(directory, f"{stem}.json"), lambda f: f.write(json.dumps(rows).encode()))
+            meta = {
+                "dimension": collection.dimension,
+                "distance": collection.distance.value,
+                "tenants": {self._segment_stem(t): t for t in collection.segments}
+            }
+            self._replace(os.path.join(directory, "collection.json"), lambda f: f.write(json.dumps(meta).encode()))
+            collection.dirty.clear()
+
+    def _written(self, collection: _Collection) -> models.UpdateResult:
+        self._operation_id += 1
+        if self.path and collection.dirty and self._flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+                self._flush_handle = loop.call_later(self.flush_delay, self.flush)
+            except RuntimeError:
+                self.flush()
+        return models.UpdateResult(operation_id=self._operation_id, status=models.UpdateStatus.COMPLETED)
+
+    def _get(self, collection_name: str) -> _Collection:
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return collection
+
+    # Collections
+
+    async def get_collections(self) -> models.CollectionsResponse:
+        return models.CollectionsResponse(
+            collections=[models.CollectionDescription(name=name) for name in self._collections]
+        )
+
+    async def collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self._collections
+
+    async def create_collection(
+        self,
+        collection_name: str,
+        vectors_config: models.VectorParams,
+        sparse_vectors_config: Optional[dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> bool:
+        if collection_name in self._collections:
+            raise ValueError(f"Collection {collection_name} already exists")
+        if sparse_vectors_config:
+            raise ValueError("The numpy backend does not support sparse vectors (hybrid collections)")
+        if not isinstance(vectors_config, models.VectorParams):
+            raise ValueError("The numpy backend only supports a single unnamed dense vector")
+        if vectors_config.distance not in SUPPORTED_DISTANCES:
+            raise ValueError(f"Unsupported distance for the numpy backend: {vectors_config.distance}")
+        collection = _Collection(collection_name, vectors_config.size, vectors_config.distance)
+        self._collections[collection_name] = collection
+        if self.path:
+            # Writes collection.json even before the first point arrives
+            collection.dirty.add(None)
+            self.flush()
+        return True
+
+    async def delete_collection(self, collection_name: str, **kwargs: Any) -> bool:
+        if self._collections.pop(collection_name, None) is None:
+            return False
+        if self.path:
+            shutil.rmtree(self._collection_dir(collection_name), ignore_errors=True)
+        return True
+
+    async def get_collection(self, collection_name: str) -> models.CollectionInfo:
+        collection = self._get(collection_name)
+        points_count = len(collection.owners)
+        return models.CollectionInfo(
+            status=models.CollectionStatus.GREEN,
+            optimizer_status=models.OptimizersStatusOneOf.OK,
+            segments_count=len(collection.segments),
+            points_count=points_count,
+            indexed_vectors_count=0,
+            config=models.CollectionConfig(
+                params=models.CollectionParams(
+                    vectors=models.VectorParams(size=collection.dimension, distance=collection.distance)
+                ),
+                hnsw_config=models.HnswConfig(m=0, ef_construct=0, full_scan_threshold=0),
+                optimizer_config=models.OptimizersConfig(default_segment_number=0, flush_interval_sec=0)
+            ),
+            payload_schema={}
+        )
+
+    async def update_collection(self, collection_name: str, **kwargs: Any) -> bool:
+        # Index and storage tuning has no meaning for brute-force search
+        self._get(collection_name)
+        return True
+
+    async def create_payload_index(self, collection_name: str, **kwargs: Any) -> models.UpdateResult:
+        return self._written(self._get(collection_name))
+
+    async def create_shard_key(self, collection_name: str, shard_key: Any, **kwargs: Any) -> bool:
+        self._get(collection_name)
+        return True
+
+    # Points
+
+    async def upsert(
+        self,
+        collection_name: str,
+        points: list[models.PointStruct],
+        **kwargs: Any
+    ) -> models.UpdateResult:
+        collection = self._get(collection_name)
+        prepared = [
+            (normalize_id(point.id), collection.prepare(point.vector), dict(point.payload or {}))
+            for point in points
+        ]
+        for point_id, vector, payload in prepared:
+            tenant = payload.get(TENANT_FIELD)
+            if collection.owners.get(point_id, tenant) != tenant:
+                collection.remove(point_id)
+            segment = collection.segments.get(tenant)
+            if segment is None:
+                segment = collection.segments[tenant] = TenantSegment(collection.dimension)
+            segment.upsert(point_id, vector, payload)
+            collection.owners[point_id] = tenant
+            collection.dirty.add(tenant)
+        return self._written(collection)
+
+    def _search(
+        self,
+        collection: _Collection,
+        query: Any,
+        query_filter: Optional[models.Filter],
+        limit: int,
+        offset: int,
+        score_threshold: Optional[float],
+        with_payload: Any,
+        with_vectors: bool
+    ) -> models.QueryResponse:
+        if isinstance(query, models.NearestQuery):
+            query = query.nearest
+        if not isinstance(query, (list, np.ndarray)):
+            raise ValueError(f"Unsupported query for the numpy backend: {type(query).__name__}")
+        vector = collection.prepare(query)
+
+        candidates = []
+        residual = _residual_filter(query_filter)
+        matches = compile_filter(residual)
+        for segment in collection.tenant_segments(query_filter):
+            mask = None
+            if residual is not None:
+                mask = np.fromiter(
+                    (matches(pid, segment.payloads[row]) for row, pid in enumerate(segment.ids)),
+                    dtype=bool,
+                    count=len(segment)
+                )
+            rows, scores = segment.top_k(vector, limit + offset, collection.distance, mask, score_threshold)
+            candidates.extend((float(score), segment, int(row)) for row, score in zip(rows, scores))
+
+        # Merge per-tenant top-k lists (only needed when the filter spans tenants)
+        descending = collection.distance != models.Distance.EUCLID
+        candidates.sort(key=lambda c: c[0], reverse=descending)
+        return models.QueryResponse(points=[
+            models.ScoredPoint(
+                id=segment.ids[row],
+                version=0,
+                score=score,
+                payload=select_payload(segment.payloads[row], with_payload),
+                vector=segment.vectors[row].tolist() if with_vectors else None
+            )
+            for score, segment, row in candidates[offset:offset + limit]
+        ])
+
+    async def query_points(
+        self,
+        collection_name: str,
+        query: Any = None,
+        prefetch: Any = None,
+        query_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+        with_payload: Any = True,
+        with_vectors: bool = False,
+        **kwargs: Any
+    ) -> models.QueryResponse:
+        if prefetch is not None:
+            raise ValueError("The numpy backend does not support prefetch/fusion queries")
+        return self._search(
+            self._get(collection_name), query, query_filter, limit, offset or 0,
+            score_threshold, with_payload, with_vectors
+        )
+
+    async def query_batch_points(
+        self,
+        collection_name: str,
+        requests: list[models.QueryRequest],
+        **kwargs: Any
+    ) -> list[models.QueryResponse]:
+        collection = self._get(collection_name)
+        return [
+            self._search(
+                collection, request.query, request.filter, request.limit or 10, request.offset or 0,
+                request.score_threshold, request.with_payload, bool(request.with_vector)
+            )
+            for request in requests
+        ]
+
+    async def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        offset: Optional[PointId] = None,
+        with_payload: Any = True,
+        with_vectors: bool = False,
+        **kwargs: Any
+    ) -> tuple[list[models.Record], Optional[PointId]]:
+        collection = self._get(collection_name)
+        segments = collection.tenant_segments(scroll_filter)
+        residual = _residual_filter(scroll_filter)
+        matches = compile_filter(residual)
+        start = _id_order(normalize_id(offset)) if offset is not None else None
+        # Walk the tenants' sorted IDs from the offset: a page costs O(log n + limit)
+        # for an unfiltered tenant scroll instead of sorting every match
+        merged = heapq.merge(*(
+            zip(segment.ordered_from(start), itertools.repeat(i)) for i, segment in enumerate(segments)
+        ))
+        page: list[tuple[TenantSegment, int]] = []
+        next_id: Optional[PointId] = None
+        for (_, point_id), i in merged:
+            segment = segments[i]
+            row = segment.rows[point_id]
+            if residual is not None and not matches(point_id, segment.payloads[row]):
+                continue
+            if len(page) == limit:
+                next_id = point_id
+                break
+            page.append((segment, row))
+        records = [
+            models.Record(
+                id=segment.ids[row],
+                payload=select_payload(segment.payloads[row], with_payload),
+                vector=segment.vectors[row].tolist() if with_vectors else None
+            )
+            for segment, row in page
+        ]
+        return records, next_id
+
+    async def count(
+        self,
+        collection_name: str,
+        count_filter: Optional[models.Filter] = None,
+        **kwargs: Any
+    ) -> models.CountResult:
+        collection = self._get(collection_name)
+        if count_filter is None:
+            return models.CountResult(count=len(collection.owners))
+        return models.CountResult(count=len(collection.matching(count_filter)))
+
+    async def delete(
+        self,
+        collection_name: str,
+        points_selector: Any,
+        **kwargs: Any
+    ) -> models.UpdateResult:
+        collection = self._get(collection_name)
+        if isinstance(points_selector, models.FilterSelector):
+            point_ids = [segment.ids[row] for segment, row in collection.matching(points_selector.filter)]
+        elif isinstance(points_selector, models.PointIdsList):
+            point_ids = [normalize_id(point_id) for point_id in points_selector.points]
+        elif isinstance(points_selector, list):
+            point_ids = [normalize_id(point_id) for point_id in points_selector]
+        else:
+            raise ValueError(f"Unsupported points selector: {points_selector!r}")
+        for point_id in point_ids:
+            collection.remove(point_id)
+        return self._written(collection)
+
+    async def batch_update_points(
+        self,
+        collection_name: str,
+        update_operations: list[Any],
+        **kwargs: Any
+    ) -> list[models.UpdateResult]:
+        collection = self._get(collection_name)
+        for operation in update_operations:
+            if not isinstance(operation, models.SetPayloadOperation):
+                raise ValueError(f"Unsupported update operation for the numpy backend: {type(operation).__name__}")
+            for point_id in operation.set_payload.points or []:
+                point_id = normalize_id(point_id)
+                if point_id not in collection.owners:
+                    continue
+                tenant = collection.owners[point_id]
+                segment = collection.segments[tenant]
+                segment.payloads[segment.rows[point_id]].update(operation.set_payload.payload)
+                collection.dirty.add(tenant)
+        return [self._written(collection) for _ in update_operations]
+
+    async def close(self, **kwargs: Any) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self.flush()
+        if self.path:
+            atexit.unregister(self.flush)
@@ -0,0 +1,276 @@
+"""
+Sampled cProfile / tracemalloc profiling of tool calls
+
+When enabled, a fraction of tool calls (sample_rate) runs under cProfile and
+tracemalloc. Results are aggregated per tool and written to output_dir:
+- <tool>.collapsed: collapsed stacks (flamegraph.pl / speedscope input),
+  weights in microseconds of self time
+- <tool>.pstats: merged cProfile stats (snakeviz, pstats)
+- <tool>.alloc.txt: top allocation sites still alive at the end of the call
+
+cProfile is per thread and asyncio interleaves coroutines, so a sampled call
+also accounts for whatever other tasks run while it awaits; time blocked on
+the network shows up under the event loop's selector. Only one call is
+profiled at a time. Unsampled calls cost a random() draw.
+"""
+
+import functools
+import logging
+import os
+import pstats
+import random
+import cProfile
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger("qdrant-mcp")
+
+# Collapsed stacks stop following callers after this many frames
+MAX_STACK_DEPTH = 64
+
+# Stack shares below this fraction of a tool's total self time are folded
+# into their parent path, which bounds the size of the collapsed file
+MIN_STACK_SHARE = 1e-4
+
+def _frame_name(func: tuple[str, int, str]) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        return name.replace(";", ",")
+    return f"{os.path.basename(filename)}:{name}:{lineno}".replace(";", ",")
+
+def collapsed_stacks(stats: pstats.Stats) -> Counter:
+    """
+    Rebuild weighted call stacks from cProfile's caller graph
+
+    cProfile only keeps caller -> callee edges, so each function's self time
+    is spread over its callers in proportion to the cumulative time each
+    edge accounts for, recursively up to the roots.
+
+    Returns:
+        Counter of "root;...;leaf" -> self time in microseconds
+    """
+    raw = stats.stats  # type: ignore[attr-defined]
+    total_us = sum(entry[2] for entry in raw.values()) * 1e6
+    min_us = max(total_us * MIN_STACK_SHARE, 1.0)
+    stacks: Counter = Counter()
+
+    def walk(func: tuple, weight: float, path: list[str], seen: frozenset) -> None:
+        callers = raw[func][4] if func in raw else {}
+        edge_total = sum(edge[3] for caller, edge in callers.items() if caller in raw)
+        if not callers or edge_total <= 0 or len(path) >= MAX_STACK_DEPTH:
+            stacks[";".join(reversed(path))] += weight
+            return
+        folded = 0.0
+        for caller, edge in callers.items():
+            share = weight * edge[3] / edge_total if caller in raw else 0.0
+            if share < min_us or caller in seen:
+                folded += share
+                continue
+            walk(caller, share, path + [_frame_name(caller)], seen | {caller})
+        if folded:
+            stacks[";".join(reversed(path))] += folded
+
+    for func, entry in raw.items():
+        self_us = entry[2] * 1e6
+        if self_us >= min_us:
+            walk(func, self_us, [_frame_name(func)], frozenset([func]))
+    return stacks
+
+class _ToolProfile:
+    """Aggregated samples for one tool"""
+
+    def __init__(self):
+        self.samples = 0
+        self.wall_ms = 0.0
+        self.stats: Optional[pstats.Stats] = None
+        self.peak_bytes = 0
+        self.peak_bytes_total = 0
+        # (filename, lineno) -> [bytes, blocks], summed over samples
+        self.allocations: dict[tuple[str, int], list[int]] = {}
+
+class ToolProfiler:
+    """
+    Switchable sampling profiler for MCP tools
+
+    Args:
+        enabled: Start with profiling on
+        sample_rate: Fraction of tool calls to profile (0..1)
+        output_dir: Directory for .collapsed/.pstats/.alloc.txt reports
+        top_allocations: Allocation sites kept in each report
+        flush_every: Write reports after this many samples of a tool
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 0.01,
+        output_dir: str = "profiles",
+        top_allocations: int = 25,
+        flush_every: int = 10
+    ):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.top_allocations = top_allocations
+        self.flush_every = flush_every
+        self.tools: dict[str, _ToolProfile] = {}
+        self.skipped_busy = 0
+        self._active = False
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        output_dir: Optional[str] = None
+    ) -> None:
+        if sample_rate is not None:
+            if not 0 <= sample_rate <= 1:
+                raise ValueError("sample_rate must be between 0 and 1")
+            self.sample_rate = sample_rate
+        if output_dir is not None:
+            self.flush()
+            self.output_dir = output_dir
+        if enabled is not None:
+            if self.enabled and not enabled:
+                self.flush()
+            self.enabled = enabled
+
+    def instrument(self, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Wrap a tool coroutine; the signature is preserved for FastMCP"""
+        tool = fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not self.enabled or random.random() >= self.sample_rate:
+                return await fn(*args, **kwargs)
+            if self._active:
+                self.skipped_busy += 1
+                return await fn(*args, **kwargs)
+            return await self._profiled(tool, fn, args, kwargs)
+
+        return wrapper
+
+    async def _profiled(self, tool: str, fn: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict) -> Any:
+        self._active = True
+        owns_tracemalloc = not tracemalloc.is_tracing()
+        if owns_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        snapshot = None
+        try:
+            profiler.enable()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+                wall_ms = (time.perf_counter() - started) * 1000
+                _, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot().filter_traces((
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, __file__)
+                ))
+        finally:
+            if owns_tracemalloc:
+                tracemalloc.stop()
+            self._active = False
+            if snapshot is not None:
+                self._record(tool, profiler, wall_ms, peak, snapshot)
+
+    def _record(
+        self,
+        tool: str,
+        profiler: cProfile.Profile,
+        wall_ms: float,
+        peak: int,
+        snapshot: tracemalloc.Snapshot
+    ) -> None:
+        profile = self.tools.setdefault(tool, _ToolProfile())
+        profile.samples += 1
+        profile.wall_ms += wall_ms
+        if profile.stats is None:
+            profile.stats = pstats.Stats(profiler)
+        else:
+            profile.stats.add(profiler)
+        profile.peak_bytes = max(profile.peak_bytes, peak)
+        profile.peak_bytes_total += peak
+        for stat in snapshot.statistics("lineno"):
+            frame = stat.traceback[0]
+            totals = profile.allocations.setdefault((frame.filename, frame.lineno), [0, 0])
+            totals[0] += stat.size
+            totals[1] += stat.count
+        if profile.samples % self.flush_every == 0:
+            try:
+                self._write(tool, profile)
+            except OSError as e:
+                logger.warning(f"Could not write profile for {tool}: {e}")
+
+    def _top_allocations(self, profile: _ToolProfile) -> list[tuple[tuple[str, int], list[int]]]:
+        return sorted(profile.allocations.items(), key=lambda item: item[1][0], reverse=True)[:self.top_allocations]
+
+    def _write(self, tool: str, profile: _ToolProfile) -> None:
+        if profile.stats is None:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, tool)
+
+        stacks = collapsed_stacks(profile.stats)
+        with open(f"{base}.collapsed.tmp", "w") as f:
+            for stack, weight in sorted(stacks.items()):
+                if int(weight):
+                    f.write(f"{stack} {int(weight)}\n")
+        os.replace(f"{base}.collapsed.tmp", f"{base}.collapsed")
+
+        profile.stats.dump_stats(f"{base}.pstats.tmp")
+        os.replace(f"{base}.pstats.tmp", f"{base}.pstats")
+
+        with open(f"{base}.alloc.txt.tmp", "w") as f:
+            f.write(
+                f"# {tool}: {profile.samples} samples, "
+                f"mean wall {profile.wall_ms / profile.samples:.1f} ms, "
+                f"peak traced {profile.peak_bytes / 1024:.1f} KiB "
+                f"(mean {profile.peak_bytes_total / profile.samples / 1024:.1f} KiB)\n"
+                f"# allocations alive at the end of the call, mean per sample\n"
+            )
+            for (filename, lineno), (size, count) in self._top_allocations(profile):
+                f.write(
+                    f"{size / profile.samples / 1024:10.1f} KiB {count / profile.samples:10.1f} blocks  "
+                    f"{filename}:{lineno}\n"
+                )
+        os.replace(f"{base}.alloc.txt.tmp", f"{base}.alloc.txt")
+
+    def flush(self) -> None:
+        """Write reports for every tool with samples"""
+        for tool, profile in self.tools.items():
+            try:
+                self._write(tool, profile)
+            except OSError as e:
+                logger.warning(f"Could not write profile for {tool}: {e}")
+
+    def reset(self) -> None:
+        self.tools.clear()
+        self.skipped_busy = 0
+
+    def stats(self) -> dict[str, Any]:
+        tools = {}
+        for tool, profile in sorted(self.tools.items()):
+            top = self._top_allocations(profile)[:5]
+            tools[tool] = {
+                "samples": profile.samples,
+                "mean_wall_ms": round(profile.wall_ms / profile.samples, 2),
+                "peak_traced_bytes": profile.peak_bytes,
+                "top_allocations": [
+                    {"site": f"{filename}:{lineno}", "mean_bytes": size // profile.samples}
+                    for (filename, lineno), (size, _) in top
+                ]
+            }
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "output_dir": self.output_dir,
+            "skipped_busy": self.skipped_busy,
+            "tools": tools
+        }
@@ -0,0 +1,310 @@
+"""
+Per-tenant admission control and fair scheduling of Qdrant requests
+
+Two layers keep one business from inflating everyone else's latency:
+
+1. Admission (per tool call): a token bucket per (business_id, priority
+   class). A call that would wait up to max_admission_wait for a token is
+   delayed; beyond that, or when the class queue is already max_queue deep,
+   it is rejected with a retry_after hint.
+2. Dispatch (per Qdrant request): at most max_concurrency requests are in
+   flight. Waiting requests are served interactive class first, and bulk
+   requests may never hold more than bulk_share of the slots, so searches
+   always find headroom. Within a class, tenants are served by start-time
+   fair queueing (weighted fair queuing), so a tenant with hundreds of
+   queued upsert batches cannot starve one with a single batch.
+
+The business and class of the current tool call travel in a ContextVar set
+by admit(), so the Qdrant calls deep inside a tool are attributed without
+threading arguments through every helper.
+"""
+
+import asyncio
+import functools
+import heapq
+import inspect
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from metrics import LATENCY_BUCKETS_MS, Histogram, record_admission_wait
+
+PRIORITIES = ("interactive", "bulk")
+
+class AdmissionRejected(Exception):
+    """A tool call was not admitted; retry after retry_after seconds"""
+
+    def __init__(self, message: str, reason: str, retry_after: float):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Classic token bucket; tokens may go negative to reserve a future slot"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, max_wait: float) -> tuple[bool, float]:
+        """
+        Take one token, waiting at most max_wait for it
+
+        Returns:
+            (admitted, seconds): how long to wait before proceeding if
+            admitted, otherwise how long until a token is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > max_wait:
+            return False, wait
+        self.tokens -= 1
+        return True, wait
+
+class _Waiter:
+    def __init__(self, future: asyncio.Future, priority: str):
+        self.future = future
+        self.priority = priority
+
+class TenantScheduler:
+    """
+    Admission control plus a fair, prioritized global concurrency cap
+
+    Args:
+        max_concurrency: Qdrant requests in flight at once, across all tenants
+        rates: Tokens per second per business for each priority class (0: unlimited)
+        bursts: Bucket size per business for each priority class
+        max_admission_wait: Longest a call is delayed for a token before rejection
+        max_queue: Queued Qdrant requests per class before new calls are rejected
+        bulk_share: Fraction of max_concurrency that bulk requests may hold
+        weights: Fair-queuing weight per business_id (default 1)
+        enabled: Turn admission on (the concurrency cap and fair dispatch
+            always apply)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        rates: Optional[dict[str, float]] = None,
+        bursts: Optional[dict[str, float]] = None,
+        max_admission_wait: float = 1.0,
+        max_queue: int = 1000,
+        bulk_share: float = 0.75,
+        weights: Optional[dict[str, float]] = None,
+        enabled: bool = False
+    ):
+        self.max_concurrency = max_concurrency
+        self.rates = rates or {"interactive": 50.0, "bulk": 10.0}
+        self.bursts = bursts or {"interactive": 100.0, "bulk": 20.0}
+        self.max_admission_wait = max_admission_wait
+        self.max_queue = max_queue
+        self.bulk_limit = max(1, int(max_concurrency * bulk_share))
+        self.weights = weights or {}
+        self.enabled = enabled
+
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._queues: dict[str, list[tuple[float, int, _Waiter]]] = {p: [] for p in PRIORITIES}
+        self._queued = {p: 0 for p in PRIORITIES}
+        self._in_flight = {p: 0 for p in PRIORITIES}
+        self._virtual_time = {p: 0.0 for p in PRIORITIES}
+        self._last_finish: dict[tuple[str, str], float] = {}
+        self._sequence = itertools.count()
+        self._service_ms = {p: 0.0 for p in PRIORITIES}
+
+        self.admitted = {p: 0 for p in PRIORITIES}
+        self.delayed = {p: 0 for p in PRIORITIES}
+        self.rejected: dict[str, int] = {}
+        self.rejected_by_tenant: dict[str, int] = {}
+        self.queue_wait = {p: Histogram(LATENCY_BUCKETS_MS) for p in PRIORITIES}
+
+        self._request: ContextVar[tuple[str, str]] = ContextVar("qdrant_mcp_request", default=("", "interactive"))
+
+    # Admission
+
+    def _bucket(self, business_id: str, priority: str) -> Optional[TokenBucket]:
+        if not self.rates.get(priority):
+            return None
+        bucket = self._buckets.get((business_id, priority))
+        if bucket is None:
+            bucket = self._buckets[(business_id, priority)] = TokenBucket(
+                self.rates[priority], self.bursts.get(priority, self.rates[priority])
+            )
+        return bucket
+
+    def _reject(self, business_id: str, reason: str, message: str, retry_after: float) -> AdmissionRejected:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        self.rejected_by_tenant[business_id] = self.rejected_by_tenant.get(business_id, 0) + 1
+        return AdmissionRejected(message, reason, round(retry_after, 3))
+
+    async def acquire_admission(self, business_id: str, priority: str) -> None:
+        """Wait for this call's token, or raise AdmissionRejected"""
+        if self._queued[priority] >= self.max_queue:
+            per_request_ms = self._service_ms[priority] or 100.0
+            retry_after = self._queued[priority] * per_request_ms / 1000 / self.max_concurrency
+            raise self._reject(
+                business_id, "overloaded",
+                f"Server overloaded: {self._queued[priority]} {priority} requests queued",
+                max(retry_after, 0.1)
+            )
+        if not business_id:
+            self.admitted[priority] += 1
+            return
+        bucket = self._bucket(business_id, priority)
+        if bucket is not None:
+            admitted, wait = bucket.reserve(self.max_admission_wait)
+            if not admitted:
+                raise self._reject(
+                    business_id, "rate_limited",
+                    f"Rate limit exceeded for business {business_id} "
+                    f"({bucket.rate:g} {priority} calls/s, burst {bucket.burst:g})",
+                    wait
+                )
+            if wait > 0:
+                self.delayed[priority] += 1
+                await asyncio.sleep(wait)
+        self.admitted[priority] += 1
+
+    def admit(self, priority: str, business_arg: str = "business_id") -> Callable:
+        """
+        Tool decorator: admission control and request attribution
+
+        Rejected calls return {"success": False, "error_type": "RateLimited"
+        or "Overloaded", "retry_after": seconds} instead of running.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}' (expected one of: {', '.join(PRIORITIES)})")
+
+        def decorator(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+            signature = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                business_id = kwargs.get(business_arg)
+                if business_id is None and args:
+                    business_id = signature.bind_partial(*args, **kwargs).arguments.get(business_arg)
+                business_id = str(business_id or "")
+                token = self._request.set((business_id, priority))
+                try:
+                    if self.enabled:
+                        started = time.perf_counter()
+                        try:
+                            await self.acquire_admission(business_id, priority)
+                        except AdmissionRejected as e:
+                            return {
+                                "success": False,
+                                "error": str(e),
+                                "error_type": "RateLimited" if e.reason == "rate_limited" else "Overloaded",
+                                "retry_after": e.retry_after
+                            }
+                        finally:
+                            record_admission_wait((time.perf_counter() - started) * 1000)
+                    return await fn(*args, **kwargs)
+                finally:
+                    self._request.reset(token)
+
+            return wrapper
+
+        return decorator
+
+    # Dispatch
+
+    def _can_start(self, priority: str) -> bool:
+        if sum(self._in_flight.values()) >= self.max_concurrency:
+            return False
+        return priority != "bulk" or self._in_flight["bulk"] < self.bulk_limit
+
+    def _dispatch(self) -> None:
+        """Hand free slots to queued requests: interactive first, then bulk"""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and self._can_start(priority):
+                start, _, waiter = heapq.heappop(queue)
+                # Cancelled waiters already left _queued when they were cancelled
+                if waiter.future.done():
+                    continue
+                self._queued[priority] -= 1
+                self._virtual_time[priority] = start
+                self._in_flight[priority] += 1
+                waiter.future.set_result(None)
+
+    def _release(self, priority: str, service_ms: float) -> None:
+        self._in_flight[priority] -= 1
+        # EWMA of request duration, used for retry_after estimates
+        previous = self._service_ms[priority]
+        self._service_ms[priority] = service_ms if not previous else previous * 0.9 + service_ms * 0.1
+        self._dispatch()
+
+    def _enqueue(self, business_id: str, priority: str) -> _Waiter:
+        weight = self.weights.get(business_id, 1.0)
+        key = (priority, business_id)
+        start = max(self._virtual_time[priority], self._last_finish.get(key, 0.0))
+        self._last_finish[key] = start + 1.0 / weight
+        if len(self._last_finish) > 10000:
+            self._last_finish = {
+                k: finish for k, finish in self._last_finish.items() if finish > self._virtual_time[k[0]]
+            }
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), priority)
+        heapq.heappush(self._queues[priority], (start, next(self._sequence), waiter))
+        self._queued[priority] += 1
+        return waiter
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold one in-flight Qdrant request slot for the current tool call"""
+        business_id, request_priority = self._request.get()
+        priority = priority or request_priority
+        queued_at = time.perf_counter()
+        if not self._queued[priority] and self._can_start(priority):
+            self._in_flight[priority] += 1
+        else:
+            waiter = self._enqueue(business_id, priority)
+            # Slots may be free if the queue only held cancelled waiters
+            self._dispatch()
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # Granted a slot just as we were cancelled: hand it back
+                    self._release(priority, 0.0)
+                else:
+                    # Still queued: stop counting it now, the heap entry is
+                    # skipped when _dispatch reaches it
+                    waiter.future.cancel()
+                    self._queued[priority] -= 1
+                raise
+        started = time.perf_counter()
+        self.queue_wait[priority].observe((started - queued_at) * 1000)
+        try:
+            yield
+        finally:
+            self._release(priority, (time.perf_counter() - started) * 1000)
+
+    def stats(self) -> dict[str, Any]:
+        top_rejected = sorted(self.rejected_by_tenant.items(), key=lambda item: item[1], reverse=True)[:10]
+        return {
+            "enabled": self.enabled,
+            "max_concurrency": self.max_concurrency,
+            "bulk_limit": self.bulk_limit,
+            "classes": {
+                priority: {
+                    "rate": self.rates.get(priority) or None,
+                    "burst": self.bursts.get(priority),
+                    "in_flight": self._in_flight[priority],
+                    "queued": self._queued[priority],
+                    "admitted": self.admitted[priority],
+                    "delayed": self.delayed[priority],
+                    "queue_wait_ms": self.queue_wait[priority].summary(),
+                    "mean_service_ms": round(self._service_ms[priority], 2)
+                }
+                for priority in PRIORITIES
+            },
+            "rejected": dict(self.rejected),
+            "top_rejected_tenants": dict(top_rejected),
+            "tenants_tracked": len(self._buckets)
+        }
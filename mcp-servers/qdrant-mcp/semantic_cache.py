@@ -0,0 +1,217 @@
+"""
+Tenant-scoped semantic cache for search results
+
+Stores recent query vectors and their results per (collection, business_id).
+A new query is answered from the cache when its cosine similarity to a cached
+query with the same search parameters reaches the configured threshold.
+Entries expire after a TTL, tenants are evicted least-recently-used first
+once the memory cap is reached, and every write to a tenant invalidates its
+entries.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+TenantKey = tuple[str, str]
+
+@dataclass
+class _CacheEntry:
+    params: Hashable
+    vector: np.ndarray
+    result: Any
+    created_at: float
+    size_bytes: int
+
+@dataclass
+class _TenantEntries:
+    entries: "OrderedDict[int, _CacheEntry]" = field(default_factory=OrderedDict)
+    size_bytes: int = 0
+
+class SemanticCache:
+    """
+    LRU/TTL cache of search results keyed by query-vector similarity
+
+    Args:
+        similarity_threshold: Minimum cosine similarity for a cache hit
+        ttl_seconds: Maximum age of a cached result
+        max_entries_per_tenant: Cached queries kept per (collection, business_id)
+        max_bytes: Approximate memory cap across all tenants
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.98,
+        ttl_seconds: float = 300.0,
+        max_entries_per_tenant: int = 256,
+        max_bytes: int = 64 * 1024 * 1024
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_tenant = max_entries_per_tenant
+        self.max_bytes = max_bytes
+        self._tenants: "OrderedDict[TenantKey, _TenantEntries]" = OrderedDict()
+        self._generations: dict[TenantKey, int] = {}
+        self._collection_generations: dict[str, int] = {}
+        self._next_id = 0
+        self._size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.near_misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector: Any) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def generation(self, collection: str, business_id: str) -> tuple[int, int]:
+        """Write generation of a tenant; pass it back to store() to drop stale results"""
+        return (
+            self._collection_generations.get(collection, 0),
+            self._generations.get((collection, business_id), 0)
+        )
+
+    def lookup(
+        self,
+        collection: str,
+        business_id: str,
+        params: Hashable,
+        vector: Any
+    ) -> Optional[Any]:
+        """
+        Return a cached result for a similar query, or None on a miss
+
+        Args:
+            collection: Collection name
+            business_id: Tenant the query is scoped to
+            params: Hashable key of every other search parameter
+            vector: Query vector
+        """
+        key = (collection, business_id)
+        tenant = self._tenants.get(key)
+        if tenant is None:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        query = self._normalize(vector)
+        best_id, best_score = None, -1.0
+        for entry_id, entry in list(tenant.entries.items()):
+            if now - entry.created_at > self.ttl_seconds:
+                self._drop_entry(tenant, entry_id)
+                continue
+            if entry.params != params or entry.vector.shape != query.shape:
+                continue
+            score = float(np.dot(entry.vector, query))
+            if score > best_score:
+                best_id, best_score = entry_id, score
+
+        if best_id is not None and best_score >= self.similarity_threshold:
+            tenant.entries.move_to_end(best_id)
+            self._tenants.move_to_end(key)
+            self.hits += 1
+            return tenant.entries[best_id].result
+
+        if best_id is not None and best_score >= self.similarity_threshold - 0.02:
+            self.near_misses += 1
+        self.misses += 1
+        return None
+
+    def store(
+        self,
+        collection: str,
+        business_id: str,
+        params: Hashable,
+        vector: Any,
+        result: Any,
+        generation: Optional[tuple[int, int]] = None
+    ) -> None:
+        """
+        Cache a search result
+
+        Args:
+            collection: Collection name
+            business_id: Tenant the query was scoped to
+            params: Hashable key of every other search parameter
+            vector: Query vector
+            result: Result to return on later hits
+            generation: Value of generation() taken before the search ran;
+                the result is discarded if the tenant was written since
+        """
+        key = (collection, business_id)
+        if generation is not None and generation != self.generation(collection, business_id):
+            return
+
+        unit = self._normalize(vector)
+        size_bytes = unit.nbytes + len(json.dumps(result, default=str))
+        if size_bytes > self.max_bytes:
+            return
+
+        tenant = self._tenants.get(key)
+        if tenant is None:
+            tenant = self._tenants[key] = _TenantEntries()
+        self._tenants.move_to_end(key)
+
+        self._next_id += 1
+        tenant.entries[self._next_id] = _CacheEntry(params, unit, result, time.monotonic(), size_bytes)
+        tenant.size_bytes += size_bytes
+        self._size_bytes += size_bytes
+
+        while len(tenant.entries) > self.max_entries_per_tenant:
+            self._drop_entry(tenant, next(iter(tenant.entries)))
+            self.evictions += 1
+        self._enforce_memory_cap()
+
+    def invalidate(self, collection: str, business_id: Optional[str] = None) -> None:
+        """Drop cached results for one tenant, or for a whole collection"""
+        if business_id is None:
+            self._collection_generations[collection] = self._collection_generations.get(collection, 0) + 1
+            keys = [key for key in self._tenants if key[0] == collection]
+        else:
+            key = (collection, business_id)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            keys = [key]
+        for key in keys:
+            tenant = self._tenants.pop(key, None)
+            if tenant is not None:
+                self._size_bytes -= tenant.size_bytes
+                self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "near_misses": self.near_misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "tenants": len(self._tenants),
+            "entries": sum(len(t.entries) for t in self._tenants.values()),
+            "size_bytes": self._size_bytes,
+            "max_bytes": self.max_bytes,
+            "similarity_threshold": self.similarity_threshold,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    def _drop_entry(self, tenant: _TenantEntries, entry_id: int) -> None:
+        entry = tenant.entries.pop(entry_id)
+        tenant.size_bytes -= entry.size_bytes
+        self._size_bytes -= entry.size_bytes
+
+    def _enforce_memory_cap(self) -> None:
+        while self._size_bytes > self.max_bytes and self._tenants:
+            key, tenant = next(iter(self._tenants.items()))
+            if tenant.entries:
+                self._drop_entry(tenant, next(iter(tenant.entries)))
+                self.evictions += 1
+            if not tenant.entries:
+                del self._tenants[key]
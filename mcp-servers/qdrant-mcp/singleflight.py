@@ -0,0 +1,89 @@
+"""
+Single-flight coalescing of identical concurrent Qdrant searches
+
+When a broadcast goes out, many customers of one business send the same
+query at once. Requests with the same key that arrive while a call for that
+key is in flight wait for it instead of issuing their own; every waiter
+receives the same result (or exception).
+
+The shared call runs as its own task, so a caller that disconnects or is
+cancelled does not cancel the call for the others. Writes to a tenant
+forget its in-flight keys: requests arriving after the write start a fresh
+call rather than joining one that may predate it.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+import numpy as np
+
+def vector_digest(vector: Any) -> bytes:
+    """Short digest of a query vector's float32 bytes"""
+    data = np.ascontiguousarray(vector, dtype=np.float32).tobytes()
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 1
+
+class SingleFlight:
+    """
+    Key -> in-flight call registry
+
+    Keys are tuples whose first two elements are (collection_name,
+    business_id), which is what invalidate() matches on.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Run fn, or join the in-flight call with the same key
+
+        Returns:
+            (result, coalesced) where coalesced is True if this caller
+            reused another caller's call
+        """
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            flight.waiters += 1
+            self.max_waiters = max(self.max_waiters, flight.waiters)
+            return await asyncio.shield(flight.task), True
+
+        self.executed += 1
+        task = asyncio.ensure_future(fn())
+        flight = self._flights[key] = _Flight(task)
+        task.add_done_callback(lambda _: self._finish(key, flight))
+        return await asyncio.shield(task), False
+
+    def _finish(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            flight.task.exception()
+
+    def invalidate(self, collection_name: str, business_id: Optional[str] = None) -> None:
+        """Stop new requests from joining calls of a tenant (or whole collection)"""
+        for key in list(self._flights):
+            if key[0] == collection_name and (business_id is None or key[1] == business_id):
+                del self._flights[key]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            "in_flight": len(self._flights),
+            "max_waiters": self.max_waiters
+        }
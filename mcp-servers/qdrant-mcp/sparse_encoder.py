@@ -0,0 +1,68 @@
+"""
+Local BM25 sparse encoder for hybrid search
+
+Turns text into Qdrant sparse vectors without a model: tokens are hashed to
+stable indices and weighted with the BM25 term-frequency saturation. The IDF
+part of BM25 is applied by Qdrant at query time (sparse vector modifier=IDF),
+so document vectors never need corpus-wide statistics.
+"""
+
+import re
+import zlib
+from collections import Counter
+
+from qdrant_client.models import SparseVector
+
+# Words, numbers and hyphenated codes such as SKUs ("COFFEE-001")
+TOKEN_PATTERN = re.compile(r"\w+(?:-\w+)*", re.UNICODE)
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercase tokens of a text
+
+    Hyphenated codes are kept whole and also split into their parts, so
+    "COFFEE-001" matches both the exact SKU and a query for "coffee".
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if "-" in token:
+            tokens.extend(part for part in token.split("-") if part)
+    return tokens
+
+def token_index(token: str) -> int:
+    """Stable sparse index of a token (crc32, identical across processes)"""
+    return zlib.crc32(token.encode("utf-8")) & 0x7FFFFFFF
+
+class BM25Encoder:
+    """
+    BM25 term-frequency encoder
+
+    Args:
+        k1: Term frequency saturation; higher lets repeated terms count more
+        b: Document length normalization strength (0 = none, 1 = full)
+        avg_doc_length: Expected tokens per chunk used for length normalization
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_length: float = 64.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    def encode_document(self, text: str) -> SparseVector:
+        """Sparse vector of a stored chunk, weighted by saturated term frequency"""
+        tokens = tokenize(text)
+        counts = Counter(token_index(token) for token in tokens)
+        length_norm = 1 - self.b + self.b * len(tokens) / self.avg_doc_length
+        indices = sorted(counts)
+        values = [
+            counts[i] * (self.k1 + 1) / (counts[i] + self.k1 * length_norm)
+            for i in indices
+        ]
+        return SparseVector(indices=indices, values=values)
+
+    def encode_query(self, text: str) -> SparseVector:
+        """Sparse vector of a query: each distinct term weighs 1 (IDF comes from Qdrant)"""
+        indices = sorted({token_index(token) for token in tokenize(text)})
+        return SparseVector(indices=indices, values=[1.0] * len(indices))
@@ -0,0 +1,424 @@
+"""
+Local replica of the busiest tenants for search_points
+
+Query counts per (collection, business_id) decay over time; a tenant whose
+recent count reaches the threshold is pulled into an in-process NumPy
+segment (numpy_backend.TenantSegment) via scroll, and its searches are then
+answered locally with exact brute-force top-k instead of a Qdrant round trip.
+Tenants with at most small_tenant_points points are replicated on their
+first query regardless of heat, so tiny tenants are served from NumPy and
+only the larger ones go to Qdrant. They share the memory budget but not the
+max_tenants slots of the hot tenants.
+
+Writes made through this server are applied to the replica (write-through).
+Writes from other processes are caught by a periodic check: a replica is
+reloaded when its size no longer matches the tenant's point count in Qdrant,
+and in any case once it is older than max_age_seconds, since in-place
+overwrites (deterministic point IDs) leave the count unchanged. Replicas are
+evicted least-recently-used to stay within the tenant and memory budgets.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncContextManager, Callable, Optional
+
+import numpy as np
+from qdrant_client.http import models
+
+from collection_config import TENANT_FIELD
+from numpy_backend import SUPPORTED_DISTANCES, TenantSegment, compile_filter, normalize_id, select_payload
+
+logger = logging.getLogger("qdrant-mcp")
+
+TenantKey = tuple[str, str]
+
+class _Replica:
+    def __init__(self, segment: TenantSegment, distance: models.Distance, shard_key: Any):
+        self.segment = segment
+        self.distance = distance
+        self.shard_key = shard_key
+        self.payload_bytes = sum(len(json.dumps(payload, default=str)) for payload in segment.payloads)
+        self.loaded_at = time.time()
+        self.small = False
+
+    @property
+    def size_bytes(self) -> int:
+        return self.segment.nbytes + self.payload_bytes
+
+class _LatencyWindow:
+    """Recent latency samples in milliseconds"""
+
+    def __init__(self, size: int = 2048):
+        self.samples: deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, elapsed_ms: float) -> None:
+        self.samples.append(elapsed_ms)
+        self.count += 1
+
+    def summary(self) -> dict[str, Any]:
+        if not self.samples:
+            return {"count": self.count}
+        values = np.fromiter(self.samples, dtype=np.float64)
+        return {
+            "count": self.count,
+            "mean_ms": round(float(values.mean()), 3),
+            "p50_ms": round(float(np.percentile(values, 50)), 3),
+            "p99_ms": round(float(np.percentile(values, 99)), 3)
+        }
+
+class TenantReplica:
+    """
+    Hot-tenant replica manager
+
+    Args:
+        client_getter: Returns the async Qdrant client
+        slot: Context manager factory bounding in-flight Qdrant requests
+        max_tenants: Maximum number of replicated tenants
+        memory_budget: Maximum bytes held by replicas (vectors + payloads)
+        min_queries: Recent queries that make a tenant hot
+        decay_seconds: Half-life of the query counts
+        refresh_seconds: Interval of the version check
+        max_age_seconds: Reload a replica this long after loading it, so
+            same-count updates from other processes show up (0: never)
+        page_size: Points per scroll page when loading a tenant
+        small_tenant_points: Replicate tenants of at most this many points
+            on their first query (0: only hot tenants)
+    """
+
+    def __init__(
+        self,
+        client_getter: Callable[[], Any],
+        slot: Callable[[], AsyncContextManager[None]],
+        max_tenants: int = 8,
+        memory_budget: int = 512 * 1024 * 1024,
+        min_queries: int = 20,
+        decay_seconds: float = 60.0,
+        refresh_seconds: float = 30.0,
+        max_age_seconds: float = 300.0,
+        page_size: int = 1000,
+        small_tenant_points: int = 0
+    ):
+        self._client_getter = client_getter
+        self._slot = slot
+        self.max_tenants = max_tenants
+        self.memory_budget = memory_budget
+        self.min_queries = min_queries
+        self.decay_seconds = decay_seconds
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self.page_size = page_size
+        self.small_tenant_points = small_tenant_points
+
+        self._query_counts: dict[TenantKey, float] = {}
+        self._last_decay = time.monotonic()
+        self._replicas: OrderedDict[TenantKey, _Replica] = OrderedDict()
+        self._loading: set[TenantKey] = set()
+        # Tenants written to while loading; their load result is discarded
+        self._stale: set[TenantKey] = set()
+        # Tenants that could not be replicated; retried after the next decay
+        self._rejected: set[TenantKey] = set()
+        # Cold tenants found too large for the small-tenant path, with the
+        # time of the count; probed again after max_age_seconds
+        self._large: dict[TenantKey, float] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self.local_latency = _LatencyWindow()
+        self.remote_latency = _LatencyWindow()
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.skipped_over_budget = 0
+
+    # Hotness tracking
+
+    def record_query(self, collection_name: str, business_id: str) -> bool:
+        """
+        Count a query for the tenant
+
+        Returns:
+            True if the tenant is hot, or may be small, but is not yet
+            replicated (caller should schedule load())
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_decay
+        if elapsed >= self.decay_seconds:
+            factor = 0.5 ** (elapsed / self.decay_seconds)
+            self._query_counts = {k: v * factor for k, v in self._query_counts.items() if v * factor >= 0.5}
+            self._last_decay = now
+            self._rejected.clear()
+        key = (collection_name, business_id)
+        count = self._query_counts.get(key, 0.0) + 1
+        self._query_counts[key] = count
+        if count < self.min_queries:
+            if not self.small_tenant_points:
+                return False
+            probed_at = self._large.get(key)
+            if probed_at is not None and (not self.max_age_seconds or now - probed_at < self.max_age_seconds):
+                return False
+        return (
+            key not in self._replicas
+            and key not in self._loading
+            and key not in self._rejected
+        )
+
+    # Local search
+
+    def search(
+        self,
+        collection_name: str,
+        business_id: str,
+        query: np.ndarray,
+        limit: int,
+        score_threshold: Optional[float],
+        with_payload: Any,
+        with_vectors: bool
+    ) -> Optional[list[models.ScoredPoint]]:
+        """Answer a tenant-scoped search locally, or None if the tenant is not replicated"""
+        key = (collection_name, business_id)
+        replica = self._replicas.get(key)
+        if replica is None:
+            return None
+        self._replicas.move_to_end(key)
+
+        vector = np.asarray(query, dtype=np.float32)
+        if replica.distance == models.Distance.COSINE:
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+        segment = replica.segment
+        rows, scores = segment.top_k(vector, limit, replica.distance, score_threshold=score_threshold)
+        return [
+            models.ScoredPoint(
+                id=segment.ids[row],
+                version=0,
+                score=float(score),
+                payload=select_payload(segment.payloads[row], with_payload),
+                vector=segment.vectors[row].tolist() if with_vectors else None
+            )
+            for row, score in zip(rows, scores)
+        ]
+
+    # Loading and eviction
+
+    async def _count(self, collection_name: str, business_id: str, shard_key: Any) -> int:
+        client = self._client_getter()
+        async with self._slot():
+            result = await client.count(
+                collection_name=collection_name,
+                count_filter=_tenant_only_filter(business_id),
+                exact=True,
+                shard_key_selector=shard_key
+            )
+        return result.count
+
+    async def load(self, collection_name: str, business_id: str, shard_key: Any = None) -> bool:
+        """Pull a tenant's points into a local segment"""
+        key = (collection_name, business_id)
+        if key in self._loading:
+            return False
+        self._loading.add(key)
+        self._stale.discard(key)
+        try:
+            client = self._client_getter()
+            async with self._slot():
+                info = await client.get_collection(collection_name=collection_name)
+            params = info.config.params.vectors
+            if not isinstance(params, models.VectorParams) or params.distance not in SUPPORTED_DISTANCES:
+                logger.info(f"Tenant replica: '{collection_name}' has no supported unnamed dense vector, skipping")
+                self._rejected.add(key)
+                return False
+
+            expected = await self._count(collection_name, business_id, shard_key)
+            small = 0 < self.small_tenant_points and expected <= self.small_tenant_points
+            if self.small_tenant_points and not small and self._query_counts.get(key, 0.0) < self.min_queries:
+                self._large[key] = time.monotonic()
+                return False
+            self._large.pop(key, None)
+            estimate = expected * params.size * 4
+            if estimate > self.memory_budget:
+                self.skipped_over_budget += 1
+                self._rejected.add(key)
+                return False
+
+            segment = TenantSegment(params.size)
+            offset = None
+            while True:
+                async with self._slot():
+                    page, offset = await client.scroll(
+                        collection_name=collection_name,
+                        scroll_filter=_tenant_only_filter(business_id),
+                        shard_key_selector=shard_key,
+                        limit=self.page_size,
+                        offset=offset,
+                        with_payload=True,
+                        with_vectors=True
+                    )
+                for record in page:
+                    vector = _dense(record.vector)
+                    if vector is None:
+                        continue
+                    segment.upsert(normalize_id(record.id), np.asarray(vector, dtype=np.float32), record.payload or {})
+                if offset is None:
+                    break
+
+            if key in self._stale:
+                return False
+            replica = _Replica(segment, params.distance, shard_key)
+            replica.small = small
+            if replica.size_bytes > self.memory_budget:
+                self.skipped_over_budget += 1
+                self._rejected.add(key)
+                return False
+            self._evict_for(replica.size_bytes, small)
+            self._replicas[key] = replica
+            self.loads += 1
+            self._ensure_refresh_task()
+            logger.info(
+                f"Tenant replica: loaded {len(segment)} points of business {business_id} "
+                f"from '{collection_name}' ({replica.size_bytes / 1024 / 1024:.1f} MiB)"
+            )
+            return True
+        except Exception as e:
+            self.load_failures += 1
+            self._rejected.add(key)
+            logger.warning(f"Tenant replica: failed to load business {business_id} from '{collection_name}': {e}")
+            return False
+        finally:
+            self._loading.discard(key)
+
+    def _evict_for(self, size_bytes: int, small: bool = False) -> None:
+        while self._replicas:
+            hot = [key for key, replica in self._replicas.items() if not replica.small]
+            if not small and hot and len(hot) >= self.max_tenants:
+                key = hot[0]
+            elif self.memory_bytes() + size_bytes > self.memory_budget:
+                key = next(iter(self._replicas))
+            else:
+                break
+            collection_name, business_id = key
+            self._replicas.pop(key)
+            self.evictions += 1
+            logger.info(f"Tenant replica: evicted business {business_id} of '{collection_name}'")
+
+    def memory_bytes(self) -> int:
+        return sum(replica.size_bytes for replica in self._replicas.values())
+
+    # Write-through
+
+    def _writable(self, key: TenantKey) -> Optional[_Replica]:
+        if key in self._loading:
+            self._stale.add(key)
+        return self._replicas.get(key)
+
+    def apply_upsert(self, collection_name: str, points: list[models.PointStruct]) -> None:
+        """Mirror upserted points into replicated tenants"""
+        replicas = [(key, replica) for key, replica in self._replicas.items() if key[0] == collection_name]
+        for point in points:
+            payload = point.payload or {}
+            key = (collection_name, payload.get(TENANT_FIELD))
+            # A point whose business_id changed must leave its previous tenant
+            for other_key, other in replicas:
+                if other_key != key:
+                    other.segment.remove(normalize_id(point.id))
+            replica = self._writable(key)
+            if replica is None:
+                continue
+            vector = _dense(point.vector)
+            if vector is None:
+                self.invalidate(*key)
+                continue
+            array = np.asarray(vector, dtype=np.float32)
+            if replica.distance == models.Distance.COSINE:
+                norm = np.linalg.norm(array)
+                if norm > 0:
+                    array = array / norm
+            replica.segment.upsert(normalize_id(point.id), array, dict(payload))
+
+    def apply_delete(self, collection_name: str, business_id: str, query_filter: models.Filter) -> None:
+        """Mirror a filter delete into the tenant's replica"""
+        replica = self._writable((collection_name, business_id))
+        if replica is None:
+            return
+        segment = replica.segment
+        matches = compile_filter(query_filter)
+        doomed = [point_id for row, point_id in enumerate(segment.ids) if matches(point_id, segment.payloads[row])]
+        for point_id in doomed:
+            segment.remove(point_id)
+
+    def invalidate(self, collection_name: str, business_id: Optional[str] = None) -> None:
+        """Drop replicas after writes that are not mirrored"""
+        for key in list(self._replicas) + list(self._loading):
+            if key[0] == collection_name and business_id in (None, key[1]):
+                self._replicas.pop(key, None)
+                if key in self._loading:
+                    self._stale.add(key)
+
+    # Version check
+
+    def _ensure_refresh_task(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        while self._replicas:
+            await asyncio.sleep(self.refresh_seconds)
+            await self.refresh()
+
+    async def refresh(self) -> None:
+        """Reload replicas that expired or whose point count no longer matches Qdrant"""
+        for key, replica in list(self._replicas.items()):
+            if self.max_age_seconds and time.time() - replica.loaded_at >= self.max_age_seconds:
+                reason = f"older than {self.max_age_seconds:g}s"
+            else:
+                try:
+                    count = await self._count(key[0], key[1], replica.shard_key)
+                except Exception as e:
+                    logger.warning(f"Tenant replica: version check failed for business {key[1]}: {e}")
+                    continue
+                if count == len(replica.segment):
+                    continue
+                reason = f"changed outside this server ({len(replica.segment)} -> {count} points)"
+            if self._replicas.get(key) is replica:
+                self._replicas.pop(key)
+                self.reloads += 1
+                logger.info(f"Tenant replica: business {key[1]} of '{key[0]}' {reason}, reloading")
+                await self.load(key[0], key[1], replica.shard_key)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "tenants": [
+                {
+                    "collection": c,
+                    "business_id": b,
+                    "points": len(r.segment),
+                    "size_bytes": r.size_bytes,
+                    "small": r.small
+                }
+                for (c, b), r in self._replicas.items()
+            ],
+            "memory_bytes": self.memory_bytes(),
+            "memory_budget": self.memory_budget,
+            "max_tenants": self.max_tenants,
+            "small_tenant_points": self.small_tenant_points,
+            "loads": self.loads,
+            "load_failures": self.load_failures,
+            "reloads": self.reloads,
+            "evictions": self.evictions,
+            "skipped_over_budget": self.skipped_over_budget,
+            "local_latency": self.local_latency.summary(),
+            "remote_latency": self.remote_latency.summary()
+        }
+
+def _tenant_only_filter(business_id: str) -> models.Filter:
+    return models.Filter(must=[models.FieldCondition(key=TENANT_FIELD, match=models.MatchValue(value=business_id))])
+
+def _dense(vector: Any) -> Any:
+    """The unnamed dense vector of a stored or upserted point"""
+    if isinstance(vector, dict):
+        return vector.get("")
+    return vector
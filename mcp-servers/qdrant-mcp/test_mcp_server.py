@@ -14,17 +14,17 @@ async def test_mcp_server():
     try:
         # Import the server
         sys.path.insert(0, '/workspaces/wabuilder/mcp-servers/qdrant-mcp')
-        from server import mcp, get_qdrant_client
+        from server import mcp, get_async_qdrant_client
 
         # Test 1: Check client connection
         print("1️⃣ Testing Qdrant client connection...")
-        client = get_qdrant_client()
+        client = get_async_qdrant_client()
         print("   ✅ Client initialized\n")
 
         # Test 2: List collections (via direct function call)
         print("2️⃣ Testing list_collections tool...")
         from server import list_collections
-        result = list_collections()
+        result = await list_collections()
         if "collections" in result:
             print(f"   ✅ Found {len(result['collections'])} collection(s)")
             for col in result['collections']:
@@ -36,7 +36,7 @@ async def test_mcp_server():
         # Test 3: Get collection info
         print("3️⃣ Testing get_collection_info tool...")
         from server import get_collection_info
-        result = get_collection_info("wab_knowledge_base")
+        result = await get_collection_info("wab_knowledge_base")
         if result.get("success"):
             print(f"   ✅ Collection: {result['name']}")
             print(f"      Points: {result['points_count']}")
@@ -47,7 +47,7 @@ async def test_mcp_server():
 
         # Test 4: Check tool definitions
         print("4️⃣ Checking MCP tool definitions...")
-        tools = mcp.list_tools()
+        tools = await mcp.list_tools()
         print(f"   ✅ Registered {len(tools)} tools:")
         for tool in tools:
             print(f"      - {tool.name}")
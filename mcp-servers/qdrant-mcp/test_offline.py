@@ -0,0 +1,859 @@
+#!/usr/bin/env python3
+"""
+Offline tests of the Qdrant MCP server tools
+
+Runs against an in-memory AsyncQdrantClient and the hash embedder, so no
+Qdrant Cloud or embedding service is needed:
+
+    python -m pytest test_offline.py
+    python test_offline.py
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import types
+import uuid
+
+import grpc
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["EMBEDDER_BACKEND"] = "hash"
+os.environ["QDRANT_EMBEDDING_CACHE_DIR"] = tempfile.mkdtemp(prefix="qdrant-mcp-test-embeddings-")
+
+from qdrant_client import AsyncQdrantClient, models
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+import server
+from client_factory import ClientConfig, client_kwargs, create_client, describe, load_client_config
+from collection_config import hnsw_config, multitenant_hnsw_config, optimizers_config, quantization_config
+from embedding_cache import EmbeddingCache, cache_key
+from numpy_backend import NumpyVectorStore, select_payload
+from scheduler import TenantScheduler, TokenBucket
+from semantic_cache import SemanticCache
+from singleflight import SingleFlight
+from sparse_encoder import BM25Encoder, token_index, tokenize
+from tenant_replica import TenantReplica
+from vector_codec import decode_vector, encode_vector
+
+BUSINESS_ID = "business-offline-test"
+
+MENU_TEXT = (
+    "Opening hours are nine to five on weekdays.\n\n"
+    "Menu: soup, salad, bread.\n\n"
+    "We deliver within ten kilometres.\n\n"
+    "Menu: soup, salad, bread."
+)
+
+async def _memory_collection() -> str:
+    """Point the server at a fresh in-memory Qdrant with one collection"""
+    client = AsyncQdrantClient(":memory:")
+    server._async_qdrant_client = client
+    collection_name = f"offline_{uuid.uuid4().hex[:8]}"
+    await client.create_collection(
+        collection_name, vectors_config=VectorParams(size=server.get_embedder().dimension, distance=Distance.COSINE)
+    )
+    return collection_name
+
+async def _count(collection_name: str) -> int:
+    return (await server._async_qdrant_client.count(collection_name, exact=True)).count
+
+def test_ingest_stores_repeated_chunks():
+    async def case():
+        collection_name = await _memory_collection()
+        result = await server.ingest_documents(
+            collection_name, BUSINESS_ID, [{"text": MENU_TEXT, "source": "menu.txt"}], chunk_size=50
+        )
+        assert result["success"], result
+        assert result["chunks_count"] == 4
+        assert result["points_count"] == 4
+        assert await _count(collection_name) == 4
+
+    asyncio.run(case())
+
+def test_sync_unchanged_document_is_a_no_op():
+    async def case():
+        collection_name = await _memory_collection()
+        first = await server.sync_document(collection_name, BUSINESS_ID, "menu.txt", MENU_TEXT, chunk_size=50)
+        assert first["success"], first
+        assert (first["upserted_count"], first["moved_count"], first["deleted_count"]) == (4, 0, 0)
+        for _ in range(2):
+            again = await server.sync_document(collection_name, BUSINESS_ID, "menu.txt", MENU_TEXT, chunk_size=50)
+            assert again["success"], again
+            assert again["unchanged_count"] == 4
+            assert (again["upserted_count"], again["moved_count"], again["deleted_count"]) == (0, 0, 0)
+        assert await _count(collection_name) == 4
+
+        edited = MENU_TEXT.replace("ten kilometres", "twenty kilometres")
+        result = await server.sync_document(collection_name, BUSINESS_ID, "menu.txt", edited, chunk_size=50)
+        assert (result["upserted_count"], result["deleted_count"]) == (1, 1), result
+        assert await _count(collection_name) == 4
+
+    asyncio.run(case())
+
+def test_sync_updates_document_fields_of_unchanged_chunks():
+    async def case():
+        collection_name = await _memory_collection()
+        await server.sync_document(
+            collection_name, BUSINESS_ID, "menu.txt", MENU_TEXT, category="menu", metadata={"lang": "en"}, chunk_size=50
+        )
+        result = await server.sync_document(
+            collection_name, BUSINESS_ID, "menu.txt", MENU_TEXT,
+            category="food", content_type="faq", metadata={"lang": "de"}, chunk_size=50
+        )
+        assert (result["upserted_count"], result["updated_count"], result["moved_count"]) == (0, 4, 0), result
+        records, _ = await server._async_qdrant_client.scroll(collection_name, limit=10)
+        assert {
+            (r.payload["category"], r.payload["content_type"], r.payload["metadata"]["lang"]) for r in records
+        } == {("food", "faq", "de")}
+        again = await server.sync_document(
+            collection_name, BUSINESS_ID, "menu.txt", MENU_TEXT,
+            category="food", content_type="faq", metadata={"lang": "de"}, chunk_size=50
+        )
+        assert again["updated_count"] == 0, again
+
+    asyncio.run(case())
+
+def test_delete_points_keeps_positional_order():
+    async def case():
+        collection_name = await _memory_collection()
+        dimension = server.get_embedder().dimension
+        await server._async_qdrant_client.upsert(collection_name, [
+            PointStruct(id=i, vector=[0.1] * dimension, payload={"business_id": business_id})
+            for i, business_id in enumerate((BUSINESS_ID, BUSINESS_ID, "other"))
+        ])
+        result = await server.delete_points(collection_name, ["0", "2"], BUSINESS_ID)
+        assert result["success"] and "deleted_count" not in result, result
+        assert await _count(collection_name) == 2
+        for business_id in (None, ""):
+            assert not (await server.delete_points(collection_name, ["1"], business_id))["success"]
+        assert await _count(collection_name) == 2
+
+    asyncio.run(case())
+
+def test_scroll_returns_vectors_unless_disabled():
+    async def case():
+        collection_name = await _memory_collection()
+        dimension = server.get_embedder().dimension
+        await server._async_qdrant_client.upsert(collection_name, [
+            PointStruct(id=1, vector=[1.0] * dimension, payload={"business_id": BUSINESS_ID, "text": "menu"})
+        ])
+        page = await server.scroll_points(collection_name, BUSINESS_ID)
+        assert len(page["points"][0]["vector"]) == dimension, page
+        page = await server.scroll_points(collection_name, BUSINESS_ID, with_vectors=False)
+        assert "vector" not in page["points"][0] and page["points"][0]["payload"]["text"] == "menu"
+
+    asyncio.run(case())
+
+def test_upsert_content_hash_ids_keep_repeated_chunks():
+    async def case():
+        collection_name = await _memory_collection()
+        dimension = server.get_embedder().dimension
+        points = [
+            {"vector": [0.1] * dimension, "payload": {"business_id": BUSINESS_ID, "source": "a.txt", "text": text}}
+            for text in ("menu", "hours", "menu")
+        ]
+        for _ in range(2):
+            result = await server.upsert_points(collection_name, points, id_mode="content_hash")
+            assert result["success"], result
+        assert await _count(collection_name) == 3
+
+    asyncio.run(case())
+
+def test_upsert_rejects_unknown_id_mode():
+    async def case():
+        collection_name = await _memory_collection()
+        points = [{"vector": [0.1] * server.get_embedder().dimension, "payload": {"business_id": BUSINESS_ID}}]
+        result = await server.upsert_points(collection_name, points, id_mode="chunk-index")
+        assert not result["success"] and "Unknown id_mode 'chunk-index'" in result["error"]
+        assert await _count(collection_name) == 0
+
+    asyncio.run(case())
+
+def test_embedding_cache_shared_directory():
+    directory = tempfile.mkdtemp(prefix="qdrant-mcp-test-cache-")
+    # Two sessions (processes) on one cache directory
+    a = EmbeddingCache(directory, 4, 4 * 4 * 8)
+    b = EmbeddingCache(directory, 4, 4 * 4 * 8)
+    hello, other = cache_key("m", "hello"), cache_key("m", "other")
+    a.put(hello, np.ones(4, dtype=np.float32))
+    b.put(other, np.full(4, 7, dtype=np.float32))
+    for cache in (a, b):
+        assert cache.get(hello).tolist() == [1, 1, 1, 1]
+        assert cache.get(other).tolist() == [7, 7, 7, 7]
+    a.flush()
+    b.flush()
+    restarted = EmbeddingCache(directory, 4, 4 * 4 * 8)
+    assert restarted.stats()["entries"] == 2
+    assert restarted.get(other).tolist() == [7, 7, 7, 7]
+
+def test_embedding_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(tempfile.mkdtemp(prefix="qdrant-mcp-test-cache-"), 4, 4 * 4 * 8)
+    keys = [cache_key("m", f"text {i}") for i in range(9)]
+    for i, key in enumerate(keys[:8]):
+        cache.put(key, np.full(4, i, dtype=np.float32))
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[8], np.full(4, 8, dtype=np.float32))
+    assert cache.get(keys[1]) is None and cache.evictions == 1
+    assert [cache.get(key)[0] for key in keys if key != keys[1]] == [0, 2, 3, 4, 5, 6, 7, 8]
+
+def test_profiling_output_dir_stays_in_root():
+    root = tempfile.mkdtemp(prefix="qdrant-mcp-test-profiles-")
+    os.symlink(tempfile.gettempdir(), os.path.join(root, "escape"))
+    previous = server.PROFILING_DIR
+    server.PROFILING_DIR = root
+    try:
+        result = asyncio.run(server.set_profiling(output_dir="incident"))
+        assert result["success"] and result["output_dir"] == os.path.join(os.path.realpath(root), "incident")
+        for path in ("../elsewhere", "/tmp", "escape/x"):
+            assert not asyncio.run(server.set_profiling(output_dir=path))["success"], path
+    finally:
+        server.PROFILING_DIR = previous
+
+def test_bulk_import_paths_confined_to_root():
+    async def case():
+        collection_name = await _memory_collection()
+        root = tempfile.mkdtemp(prefix="qdrant-mcp-test-import-")
+        outside = tempfile.mkdtemp(prefix="qdrant-mcp-test-outside-")
+        dimension = server.get_embedder().dimension
+        for directory in (root, outside):
+            with open(os.path.join(directory, "points.jsonl"), "w") as f:
+                for i in range(10):
+                    f.write(json.dumps({"payload": {"business_id": BUSINESS_ID, "i": i}, "vector": [0.5] * dimension}))
+                    f.write("\n")
+        os.symlink(os.path.join(outside, "points.jsonl"), os.path.join(root, "linked.jsonl"))
+
+        previous = server.BULK_IMPORT_ROOT
+        try:
+            server.BULK_IMPORT_ROOT = None
+            result = await server.bulk_import(collection_name, os.path.join(root, "points.jsonl"))
+            assert result["error_type"] == "PermissionError", result
+
+            server.BULK_IMPORT_ROOT = root
+            for points_path, checkpoint_path in (
+                (os.path.join(outside, "points.jsonl"), None),
+                ("../" + os.path.basename(outside) + "/points.jsonl", None),
+                ("linked.jsonl", None),
+                ("points.jsonl", os.path.join(outside, "checkpoint.json"))
+            ):
+                result = await server.bulk_import(collection_name, points_path, checkpoint_path=checkpoint_path)
+                assert not result["success"] and "outside QDRANT_IMPORT_ROOT" in result["error"], result
+            assert await _count(collection_name) == 0
+            assert os.listdir(outside) == ["points.jsonl"]
+
+            result = await server.bulk_import(collection_name, "points.jsonl")
+            assert result["success"] and result["points_count"] == 10, result
+        finally:
+            server.BULK_IMPORT_ROOT = previous
+
+    asyncio.run(case())
+
+class _ShardedMemoryClient(AsyncQdrantClient):
+    """In-memory client reporting custom sharding with the given shard keys"""
+
+    def __init__(self, shard_keys: list[str]):
+        super().__init__(":memory:")
+        self.shard_keys = shard_keys
+        self.cluster_info_calls = 0
+
+    async def get_collection(self, collection_name, **kwargs):
+        info = await super().get_collection(collection_name, **kwargs)
+        info.config.params.sharding_method = models.ShardingMethod.CUSTOM
+        return info
+
+    async def collection_cluster_info(self, collection_name, **kwargs):
+        self.cluster_info_calls += 1
+        shards = [types.SimpleNamespace(shard_key=key) for key in self.shard_keys]
+        return types.SimpleNamespace(local_shards=shards, remote_shards=[])
+
+def test_collection_layout_picks_up_new_shards():
+    async def case():
+        client = _ShardedMemoryClient(["default", "big"])
+        collection_name = f"offline_{uuid.uuid4().hex[:8]}"
+        await client.create_collection(collection_name, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+
+        layout = await server.get_collection_layout(client, collection_name, "big")
+        assert layout.shard_key("big") == "big" and layout.shard_key("new") == "default"
+        # Another server process gives "new" its own shard
+        client.shard_keys.append("new")
+        layout = await server.get_collection_layout(client, collection_name, "new")
+        assert layout.shard_key("new") == "default" and client.cluster_info_calls == 1
+        layout.shards_read_at -= server.LAYOUT_MISS_REFRESH_SECONDS
+        layout = await server.get_collection_layout(client, collection_name, "new")
+        assert layout.shard_key("new") == "new" and client.cluster_info_calls == 2
+
+        # Past the TTL the whole layout is reloaded
+        layout.loaded_at -= server.LAYOUT_TTL_SECONDS
+        assert await server.get_collection_layout(client, collection_name) is not layout
+        assert client.cluster_info_calls == 3
+
+    asyncio.run(case())
+
+def test_bulk_import_same_named_files_keep_their_points():
+    async def case():
+        collection_name = await _memory_collection()
+        root = tempfile.mkdtemp(prefix="qdrant-mcp-test-import-")
+        dimension = server.get_embedder().dimension
+        for tenant in ("a", "b"):
+            os.mkdir(os.path.join(root, tenant))
+            with open(os.path.join(root, tenant, "points.jsonl"), "w") as f:
+                for i in range(5):
+                    f.write(json.dumps({"business_id": tenant, "i": i}))
+                    f.write("\n")
+            np.save(os.path.join(root, tenant, "vectors.npy"), np.ones((5, dimension), dtype=np.float32))
+
+        previous = server.BULK_IMPORT_ROOT
+        server.BULK_IMPORT_ROOT = root
+        try:
+            for tenant in ("a", "b"):
+                result = await server.bulk_import(
+                    collection_name, f"{tenant}/points.jsonl", vectors_path=f"{tenant}/vectors.npy"
+                )
+                assert result["success"] and result["points_count"] == 5, result
+        finally:
+            server.BULK_IMPORT_ROOT = previous
+        assert await _count(collection_name) == 10
+
+    asyncio.run(case())
+
+def test_metrics_record_fastmcp_encode():
+    async def case():
+        collection_name = await _memory_collection()
+        arguments = {
+            "collection_name": collection_name,
+            "query_vector": [0.1] * server.get_embedder().dimension,
+            "business_id": BUSINESS_ID
+        }
+        content = await server.mcp.call_tool("search_points", arguments)
+        entry = server.server_metrics.snapshot()["tools"]["search_points"][collection_name]
+        assert entry["latency_ms"]["encode"]["count"] == 1
+        assert entry["response_bytes"]["max"] == len(content[0][0].text)
+
+    asyncio.run(case())
+
+def test_only_transient_errors_are_retried():
+    def rpc_error(code):
+        return grpc.aio.AioRpcError(code, grpc.aio.Metadata(), grpc.aio.Metadata(), "details")
+
+    def http_error(status_code):
+        return UnexpectedResponse(status_code, "", b"", httpx.Headers())
+
+    retryable = [
+        http_error(429),
+        http_error(503),
+        rpc_error(grpc.StatusCode.UNAVAILABLE),
+        rpc_error(grpc.StatusCode.DEADLINE_EXCEEDED),
+        rpc_error(grpc.StatusCode.RESOURCE_EXHAUSTED),
+        ResponseHandlingException(httpx.ConnectError("refused")),
+        ResponseHandlingException(httpx.ReadTimeout("slow")),
+        ConnectionResetError(),
+        asyncio.TimeoutError()
+    ]
+    permanent = [
+        http_error(400),
+        http_error(404),
+        rpc_error(grpc.StatusCode.INVALID_ARGUMENT),
+        rpc_error(grpc.StatusCode.NOT_FOUND),
+        ResponseHandlingException(ValueError("unparseable response")),
+        ValueError("could not broadcast input array from shape (3,) into shape (4,)"),
+        KeyError("vector")
+    ]
+    for error in retryable:
+        assert server._is_retryable(error), repr(error)
+    for error in permanent:
+        assert not server._is_retryable(error), repr(error)
+
+async def _replicated_tenants(max_age_seconds: float = 300.0) -> tuple[str, TenantReplica]:
+    """In-memory collection with two tenants of two points each, both replicated"""
+    collection_name = await _memory_collection()
+    client = server._async_qdrant_client
+    dimension = server.get_embedder().dimension
+    await client.upsert(collection_name, [
+        PointStruct(id=i, vector=[float(i + 1)] * dimension, payload={"business_id": business_id, "text": f"v1-{i}"})
+        for i, business_id in enumerate(("a", "a", "b", "b"))
+    ])
+    replica = TenantReplica(lambda: client, contextlib.nullcontext, max_age_seconds=max_age_seconds)
+    for business_id in ("a", "b"):
+        assert await replica.load(collection_name, business_id)
+    return collection_name, replica
+
+def _replica_hits(replica: TenantReplica, collection_name: str, business_id: str) -> dict:
+    query = np.ones(server.get_embedder().dimension, dtype=np.float32)
+    points = replica.search(collection_name, business_id, query, 10, None, True, False)
+    return {point.id: point.payload["text"] for point in points}
+
+def test_replica_reloads_in_place_updates_after_max_age():
+    async def case():
+        collection_name, replica = await _replicated_tenants()
+        # Another process overwrites a point: the tenant's count is unchanged
+        await server._async_qdrant_client.set_payload(collection_name, {"text": "v2-0"}, points=[0])
+        await replica.refresh()
+        assert _replica_hits(replica, collection_name, "a")[0] == "v1-0"
+        for loaded in replica._replicas.values():
+            loaded.loaded_at -= replica.max_age_seconds
+        await replica.refresh()
+        assert _replica_hits(replica, collection_name, "a")[0] == "v2-0"
+        assert replica.reloads == 2
+
+    asyncio.run(case())
+
+def test_replica_upsert_moves_point_between_tenants():
+    async def case():
+        collection_name, replica = await _replicated_tenants()
+        dimension = server.get_embedder().dimension
+        moved = PointStruct(id=0, vector=[1.0] * dimension, payload={"business_id": "b", "text": "moved"})
+        await server._async_qdrant_client.upsert(collection_name, [moved])
+        replica.apply_upsert(collection_name, [moved])
+        assert _replica_hits(replica, collection_name, "a") == {1: "v1-1"}
+        assert _replica_hits(replica, collection_name, "b") == {0: "moved", 2: "v1-2", 3: "v1-3"}
+
+    asyncio.run(case())
+
+def test_replica_serves_small_tenants_on_first_query():
+    async def case():
+        collection_name = await _memory_collection()
+        client = server._async_qdrant_client
+        dimension = server.get_embedder().dimension
+        await client.upsert(collection_name, [
+            PointStruct(id=i, vector=[float(i + 1)] * dimension, payload={"business_id": business_id, "text": f"v1-{i}"})
+            for i, business_id in enumerate(("a", "b", "b", "b"))
+        ])
+        replica = TenantReplica(lambda: client, contextlib.nullcontext, max_tenants=1, small_tenant_points=2)
+        assert replica.record_query(collection_name, "a")
+        assert await replica.load(collection_name, "a")
+        assert _replica_hits(replica, collection_name, "a") == {0: "v1-0"}
+        # Too large and cold: one count, then left to Qdrant
+        assert replica.record_query(collection_name, "b")
+        assert not await replica.load(collection_name, "b")
+        assert not replica.record_query(collection_name, "b")
+        assert replica.search(collection_name, "b", np.ones(dimension), 10, None, True, False) is None
+        # Once hot it takes the hot slot without evicting the small tenant
+        replica.min_queries = 2
+        assert replica.record_query(collection_name, "b")
+        assert await replica.load(collection_name, "b")
+        assert set(_replica_hits(replica, collection_name, "b")) == {1, 2, 3}
+        assert _replica_hits(replica, collection_name, "a") == {0: "v1-0"}
+
+    asyncio.run(case())
+
+def test_numpy_payload_selectors_follow_dotted_keys():
+    payload = {"business_id": "a", "metadata": {"source": "menu.txt", "page": 2}, "text": "soup"}
+    assert select_payload(payload, ["metadata.source", "text", "missing.key"]) == {
+        "metadata": {"source": "menu.txt"}, "text": "soup"
+    }
+    excluded = select_payload(payload, models.PayloadSelectorExclude(exclude=["metadata.page", "text"]))
+    assert excluded == {"business_id": "a", "metadata": {"source": "menu.txt"}}
+    assert payload["metadata"] == {"source": "menu.txt", "page": 2}
+
+def test_client_config_resolution():
+    saved = {name: os.environ.pop(name) for name in list(os.environ) if name.startswith("QDRANT_")}
+    try:
+        config = load_client_config()
+        assert config.url is None and config.api_key is None and config.backend == "qdrant"
+        try:
+            create_client(config)
+            assert False, "connected without QDRANT_URL"
+        except ValueError as e:
+            assert "QDRANT_URL" in str(e)
+
+        # Environment overrides the config file, which overrides the defaults
+        config_file = os.path.join(tempfile.mkdtemp(prefix="qdrant-mcp-test-config-"), "qdrant.json")
+        with open(config_file, "w") as f:
+            json.dump({"url": "http://file:6333", "api_key": "from-file", "prefer_grpc": True, "pool_size": 4}, f)
+        os.environ.update(QDRANT_CONFIG_FILE=config_file, QDRANT_URL="http://env:6333", QDRANT_POOL_SIZE="none")
+        config = load_client_config()
+        assert (config.url, config.api_key, config.prefer_grpc, config.pool_size) == (
+            "http://env:6333", "from-file", True, None
+        )
+        os.environ["QDRANT_COMPRESSION"] = "brotli"
+        try:
+            load_client_config()
+            assert False, "accepted an unknown compression"
+        except ValueError as e:
+            assert "brotli" in str(e)
+    finally:
+        for name in [name for name in os.environ if name.startswith("QDRANT_")]:
+            del os.environ[name]
+        os.environ.update(saved)
+
+def test_client_kwargs_follow_transport():
+    rest = client_kwargs(ClientConfig(url="http://qdrant:6333", api_key="secret", pool_size=8))
+    assert not rest["prefer_grpc"] and "grpc_options" not in rest
+    assert rest["limits"].max_connections == 8 and rest["limits"].max_keepalive_connections == 8
+    grpc_config = ClientConfig(url="http://qdrant:6333", api_key="secret", prefer_grpc=True, compression="gzip")
+    kwargs = client_kwargs(grpc_config)
+    assert kwargs["prefer_grpc"] and "limits" not in kwargs
+    assert kwargs["grpc_compression"] == grpc.Compression.Gzip
+    assert kwargs["grpc_options"]["grpc.keepalive_permit_without_calls"] == 1
+    assert "secret" not in describe(grpc_config) and "gRPC:6334" in describe(grpc_config)
+
+def test_numpy_scroll_pages_in_id_order():
+    async def case():
+        store = NumpyVectorStore()
+        await store.create_collection("c", vectors_config=VectorParams(size=4, distance=Distance.DOT))
+        uuids = sorted(str(uuid.uuid4()) for _ in range(5))
+        ids = [*range(0, 30, 3), *uuids]
+        await store.upsert("c", [
+            PointStruct(id=point_id, vector=[1.0] * 4, payload={"business_id": "ab"[i % 2], "keep": i % 3 != 0})
+            for i, point_id in enumerate(reversed(ids))
+        ])
+        query_filter = models.Filter(
+            must=[
+                models.FieldCondition(key="business_id", match=models.MatchAny(any=["a", "b"])),
+                models.FieldCondition(key="keep", match=models.MatchValue(value=True))
+            ],
+            must_not=[models.HasIdCondition(has_id=[uuids[0]])]
+        )
+        expected = [
+            point_id for i, point_id in enumerate(reversed(ids)) if i % 3 != 0 and point_id != uuids[0]
+        ]
+        expected.sort(key=lambda point_id: (isinstance(point_id, str), point_id))
+        pages, offset = [], None
+        while True:
+            records, offset = await store.scroll("c", scroll_filter=query_filter, limit=4, offset=offset)
+            pages.append([record.id for record in records])
+            if offset is None:
+                break
+        assert [point_id for page in pages for point_id in page] == expected
+        assert all(len(page) == 4 for page in pages[:-1])
+
+    asyncio.run(case())
+
+def test_scheduler_forgets_cancelled_waiters():
+    async def case():
+        scheduler = TenantScheduler(max_concurrency=1, max_queue=2, enabled=True)
+        holder = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot("interactive"):
+                await holder.wait()
+
+        async def queued():
+            async with scheduler.slot("interactive"):
+                pass
+
+        running = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(queued()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["classes"]["interactive"]["queued"] == 2
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        assert scheduler.stats()["classes"]["interactive"]["queued"] == 0
+        # No false "overloaded" while the cancelled entries are still in the heap
+        await scheduler.acquire_admission("", "interactive")
+
+        holder.set()
+        await running
+        await asyncio.wait_for(queued(), timeout=1)
+        classes = scheduler.stats()["classes"]
+        assert classes["interactive"]["queued"] == 0 and classes["interactive"]["in_flight"] == 0
+
+    asyncio.run(case())
+
+def test_vector_codec_round_trips():
+    vector = np.array([0.5, -1.25, 3.0, 0.0], dtype=np.float32)
+    for encoding in ("float32", "float16"):
+        encoded = encode_vector(vector, encoding)
+        assert isinstance(encoded, str)
+        decoded = decode_vector(encoded, encoding)
+        assert decoded.dtype == np.float32 and np.array_equal(decoded, vector)
+    assert len(encode_vector(vector, "float16")) < len(encode_vector(vector, "float32"))
+    assert encode_vector([0.5, 1.0]) == [0.5, 1.0]
+    # Base64 strings are float32 unless told otherwise
+    assert np.array_equal(decode_vector(encode_vector(vector, "float32")), vector)
+    for bad, encoding in (("AAAAAAA=", "float32"), ("AAAA", "float16"), ("not base64!", "float32")):
+        try:
+            decode_vector(bad, encoding)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad!r} decoded as {encoding}")
+    try:
+        encode_vector(vector, "int8")
+    except ValueError as e:
+        assert "Unknown vector encoding 'int8'" in str(e)
+    else:
+        raise AssertionError("unknown encoding accepted")
+
+def test_base64_vectors_through_upsert_and_search():
+    async def case():
+        collection_name = await _memory_collection()
+        vector = np.linspace(0.1, 1.0, server.get_embedder().dimension, dtype=np.float32)
+        result = await server.upsert_points(collection_name, [{
+            "id": 1, "vector": encode_vector(vector, "float16"), "payload": {"business_id": BUSINESS_ID}
+        }], vector_encoding="float16")
+        assert result["success"], result
+        found = await server.search_points(
+            collection_name, encode_vector(vector, "float32"), BUSINESS_ID,
+            vector_encoding="float32", with_vectors=True, use_cache=False
+        )
+        assert found["success"], found
+        stored = decode_vector(found["results"][0]["vector"], "float32")
+        expected = vector.astype(np.float16).astype(np.float32)
+        assert np.allclose(stored, expected / np.linalg.norm(expected), atol=1e-6)
+
+    asyncio.run(case())
+
+def test_search_batch_keeps_query_order_and_tenant_scope():
+    async def case():
+        collection_name = await _memory_collection()
+        dimension = server.get_embedder().dimension
+        axes = np.eye(dimension, dtype=np.float32)
+        await server._async_qdrant_client.upsert(collection_name, [
+            PointStruct(id=i, vector=axes[i].tolist(), payload={"business_id": business_id, "content_type": kind})
+            for i, (business_id, kind) in enumerate(
+                ((BUSINESS_ID, "faq"), (BUSINESS_ID, "menu"), (BUSINESS_ID, "faq"), ("other-business", "faq"))
+            )
+        ])
+        near_one = (axes[1] + 0.5 * axes[0] + 0.25 * axes[2]).tolist()
+        result = await server.search_batch(collection_name, BUSINESS_ID, [
+            {"vector": encode_vector(axes[2], "float32")},
+            {"vector": near_one, "limit": 1},
+            {"vector": near_one, "content_type": "faq"},
+            {"vector": axes[3].tolist(), "score_threshold": 0.5}
+        ], vector_encoding="float32")
+        assert result["success"] and result["count"] == 4, result
+        first, limited, filtered, foreign = (batch["results"] for batch in result["results"])
+        assert [hit["id"] for hit in first] == ["2"]
+        assert [hit["id"] for hit in limited] == ["1"]
+        assert [hit["id"] for hit in filtered] == ["0", "2"]
+        # The other business's point matches the query exactly but is never returned
+        assert foreign == []
+
+    asyncio.run(case())
+
+def test_semantic_cache_hits_expiry_and_invalidation():
+    cache = SemanticCache(similarity_threshold=0.98, ttl_seconds=300)
+    vector = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    close = np.array([1.0, 0.05, 0.0], dtype=np.float32)
+    cache.store("kb", "a", ("limit", 10), vector, ["hit"])
+    assert cache.lookup("kb", "a", ("limit", 10), close) == ["hit"]
+    assert cache.lookup("kb", "a", ("limit", 10), np.array([1.0, 0.5, 0.0])) is None
+    assert cache.lookup("kb", "a", ("limit", 5), vector) is None
+    assert cache.lookup("kb", "b", ("limit", 10), vector) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    # A write to the tenant between generation() and store() discards the result
+    generation = cache.generation("kb", "a")
+    cache.invalidate("kb", "a")
+    assert cache.lookup("kb", "a", ("limit", 10), vector) is None
+    cache.store("kb", "a", ("limit", 10), vector, ["stale"], generation=generation)
+    assert cache.lookup("kb", "a", ("limit", 10), vector) is None
+    cache.store("kb", "a", ("limit", 10), vector, ["fresh"], generation=cache.generation("kb", "a"))
+    cache.store("kb", "b", ("limit", 10), vector, ["other"])
+    assert cache.lookup("kb", "a", ("limit", 10), vector) == ["fresh"]
+
+    # Collection-wide invalidation also bumps every tenant's generation
+    generation = cache.generation("kb", "b")
+    cache.invalidate("kb")
+    assert cache.stats()["entries"] == 0 and cache.generation("kb", "b") != generation
+
+    cache.store("kb", "a", ("limit", 10), vector, ["old"])
+    cache.ttl_seconds = -1
+    assert cache.lookup("kb", "a", ("limit", 10), vector) is None
+    assert cache.stats()["size_bytes"] == 0
+
+def test_search_points_cache_invalidated_by_writes():
+    async def case():
+        collection_name = await _memory_collection()
+        dimension = server.get_embedder().dimension
+        point = {"id": 1, "vector": [1.0] * dimension, "payload": {"business_id": BUSINESS_ID, "text": "v1"}}
+        await server.upsert_points(collection_name, [point])
+        first = await server.search_points(collection_name, [1.0] * dimension, BUSINESS_ID)
+        second = await server.search_points(collection_name, [1.0] * dimension, BUSINESS_ID)
+        assert "cached" not in first and second["cached"] and second["results"] == first["results"]
+        await server.upsert_points(collection_name, [{**point, "payload": {"business_id": BUSINESS_ID, "text": "v2"}}])
+        third = await server.search_points(collection_name, [1.0] * dimension, BUSINESS_ID)
+        assert "cached" not in third and third["results"][0]["payload"]["text"] == "v2"
+
+    enabled = server.SEARCH_CACHE_ENABLED
+    server.SEARCH_CACHE_ENABLED = True
+    try:
+        asyncio.run(case())
+    finally:
+        server.SEARCH_CACHE_ENABLED = enabled
+
+def test_bm25_encoder_keeps_codes_and_saturates():
+    assert tokenize("Order COFFEE-001 now") == ["order", "coffee-001", "coffee", "001", "now"]
+    encoder = BM25Encoder(k1=1.2, b=0.0)
+    once = encoder.encode_document("tea")
+    many = encoder.encode_document("tea tea tea tea tea tea tea tea")
+    assert once.indices == many.indices == [token_index("tea")]
+    assert once.values[0] == 1.0 and 1.0 < many.values[0] < encoder.k1 + 1
+    query = encoder.encode_query("tea tea coffee")
+    assert query.indices == sorted({token_index("tea"), token_index("coffee")}) and query.values == [1.0, 1.0]
+
+def test_hybrid_search_fuses_dense_and_bm25_ranks():
+    async def case():
+        await _memory_collection()
+        collection_name = f"offline_hybrid_{uuid.uuid4().hex[:8]}"
+        dimension = server.get_embedder().dimension
+        created = await server.create_collection(collection_name, dimension, hybrid=True)
+        assert created["success"], created
+        axes = np.eye(dimension, dtype=np.float32)
+        texts = ("House blend espresso", "Beans sold as SKU COFFEE-001", "Green tea leaves")
+        points = [
+            {"id": i, "vector": axes[i].tolist(), "payload": {"business_id": BUSINESS_ID, "text": text}}
+            for i, text in enumerate(texts)
+        ]
+        points.append({"id": 3, "vector": axes[1].tolist(), "payload": {"business_id": "other-business", "text": texts[1]}})
+        assert (await server.upsert_points(collection_name, points))["success"]
+
+        # Dense alone ranks 0 over 1; only 1 matches the SKU, so RRF puts it first
+        query_vector = (axes[0] + 0.1 * axes[1]).tolist()
+        result = await server.hybrid_search(collection_name, query_vector, "COFFEE-001", BUSINESS_ID, limit=3)
+        assert result["success"], result
+        assert [hit["id"] for hit in result["results"]][:2] == ["1", "0"]
+        assert "3" not in {hit["id"] for hit in result["results"]}
+
+        flat = await _memory_collection()
+        refused = await server.hybrid_search(flat, query_vector, "COFFEE-001", BUSINESS_ID)
+        assert not refused["success"] and "hybrid=True" in refused["error"]
+
+    asyncio.run(case())
+
+def test_singleflight_coalesces_identical_calls():
+    async def case():
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def search(tag: str):
+            calls.append(tag)
+            await release.wait()
+            return [tag]
+
+        key, other = ("kb", "a", "q"), ("kb", "b", "q")
+        first = asyncio.create_task(flights.do(key, lambda: search("first")))
+        await asyncio.sleep(0)
+        # A caller that goes away does not cancel the shared call
+        dropped = asyncio.create_task(flights.do(key, lambda: search("dropped")))
+        joined = asyncio.create_task(flights.do(key, lambda: search("joined")))
+        separate = asyncio.create_task(flights.do(other, lambda: search("separate")))
+        await asyncio.sleep(0)
+        dropped.cancel()
+        # After a write to the tenant, new callers start a fresh call
+        flights.invalidate("kb", "a")
+        fresh = asyncio.create_task(flights.do(key, lambda: search("fresh")))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await first == (["first"], False)
+        assert await joined == (["first"], True)
+        assert await separate == (["separate"], False)
+        assert await fresh == (["fresh"], False)
+        assert dropped.cancelled() and calls == ["first", "separate", "fresh"]
+        assert flights.stats()["in_flight"] == 0 and flights.max_waiters == 3
+
+        async def failing():
+            raise RuntimeError("qdrant down")
+
+        results = await asyncio.gather(*(flights.do(key, failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    asyncio.run(case())
+
+def test_token_bucket_admission():
+    bucket = TokenBucket(rate=10.0, burst=2.0)
+    assert bucket.reserve(0.0) == (True, 0.0) and bucket.reserve(0.0) == (True, 0.0)
+    admitted, retry_after = bucket.reserve(0.0)
+    assert not admitted and 0.09 < retry_after <= 0.1
+    admitted, wait = bucket.reserve(0.5)
+    assert admitted and 0.09 < wait <= 0.1
+
+    async def case():
+        scheduler = TenantScheduler(
+            rates={"interactive": 1.0, "bulk": 0.0}, bursts={"interactive": 1.0}, max_admission_wait=0.0, enabled=True
+        )
+
+        @scheduler.admit("interactive")
+        async def tool(business_id: str) -> dict:
+            return {"success": True}
+
+        assert (await tool("a"))["success"]
+        limited = await tool(business_id="a")
+        assert limited["error_type"] == "RateLimited" and limited["retry_after"] > 0
+        # Buckets are per business
+        assert (await tool("b"))["success"]
+        assert scheduler.stats()["classes"]["interactive"]["admitted"] == 2
+
+    asyncio.run(case())
+
+def test_scheduler_serves_tenants_fairly_and_interactive_first():
+    async def case():
+        scheduler = TenantScheduler(max_concurrency=1)
+        holder = asyncio.Event()
+        served = []
+
+        async def request(business_id: str, priority: str):
+            @scheduler.admit(priority)
+            async def tool(business_id: str):
+                async with scheduler.slot():
+                    served.append((business_id, priority))
+                    if business_id == "holder":
+                        await holder.wait()
+            await tool(business_id)
+
+        tasks = [asyncio.create_task(request("holder", "bulk"))]
+        await asyncio.sleep(0)
+        # One business floods the bulk queue before another sends one batch
+        for business_id in ("a", "a", "a", "b"):
+            tasks.append(asyncio.create_task(request(business_id, "bulk")))
+            await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("c", "interactive")))
+        await asyncio.sleep(0)
+        holder.set()
+        await asyncio.gather(*tasks)
+        assert served == [
+            ("holder", "bulk"), ("c", "interactive"), ("a", "bulk"), ("b", "bulk"), ("a", "bulk"), ("a", "bulk")
+        ]
+
+    asyncio.run(case())
+
+def test_quantization_config_modes():
+    assert quantization_config(None) is None and quantization_config("none") is None
+    scalar = quantization_config("scalar", always_ram=False, quantile=0.95)
+    assert scalar.scalar.type == models.ScalarType.INT8
+    assert (scalar.scalar.quantile, scalar.scalar.always_ram) == (0.95, False)
+    assert quantization_config("binary").binary.always_ram
+    assert quantization_config("product", product_compression="x32").product.compression == models.CompressionRatio.X32
+    for mode, kwargs in (("int4", {}), ("product", {"product_compression": "x3"})):
+        try:
+            quantization_config(mode, **kwargs)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{mode} {kwargs} accepted")
+
+    assert server._search_params() is None
+    params = server._search_params(rescore=True, oversampling=2.0)
+    assert params.quantization.rescore and params.quantization.oversampling == 2.0 and not params.exact
+    assert server._search_params(hnsw_ef=128).quantization is None
+
+def test_hnsw_and_optimizer_config_builders():
+    assert hnsw_config() is None and optimizers_config() is None
+    # Only options that were set are sent, so Qdrant keeps its defaults for the rest
+    assert hnsw_config(m=32, on_disk=True).model_dump(exclude_unset=True) == {"m": 32, "on_disk": True}
+    assert multitenant_hnsw_config(payload_m=8).model_dump(exclude_unset=True) == {"m": 0, "payload_m": 8}
+    assert optimizers_config(memmap_threshold=20000).model_dump(exclude_unset=True) == {"memmap_threshold": 20000}
+    assert optimizers_config(indexing_threshold=0).indexing_threshold == 0
+
+if __name__ == "__main__":
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {type(e).__name__}: {e}")
+    sys.exit(1 if failed else 0)
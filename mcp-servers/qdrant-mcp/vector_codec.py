@@ -0,0 +1,64 @@
+"""
+Compact vector encodings for MCP messages
+
+Vectors can travel as JSON float lists or as base64 strings holding raw
+little-endian float32 (or float16) bytes. Base64 payloads are decoded with
+numpy.frombuffer, so no per-element Python objects are created while parsing.
+"""
+
+import base64
+from typing import Any, Union
+
+import numpy as np
+
+# Encoding name -> little-endian numpy dtype. "json" means a plain float list.
+VECTOR_ENCODINGS = {
+    "json": None,
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+}
+
+EncodedVector = Union[list[float], str]
+
+def _dtype_for(encoding: str) -> Any:
+    if encoding not in VECTOR_ENCODINGS:
+        raise ValueError(
+            f"Unknown vector encoding '{encoding}' (expected one of: {', '.join(VECTOR_ENCODINGS)})"
+        )
+    return VECTOR_ENCODINGS[encoding]
+
+def decode_vector(value: EncodedVector, encoding: str = "json") -> np.ndarray:
+    """
+    Decode a vector received over MCP into a float32 array
+
+    Args:
+        value: Float list, or base64 string of packed little-endian floats
+        encoding: "json", "float32" or "float16"
+
+    Returns:
+        1-D float32 numpy array
+    """
+    if isinstance(value, str):
+        dtype = _dtype_for(encoding) or VECTOR_ENCODINGS["float32"]
+        raw = base64.b64decode(value, validate=True)
+        if len(raw) % dtype.itemsize:
+            raise ValueError(f"Encoded vector is {len(raw)} bytes, not a multiple of {dtype.itemsize}")
+        return np.frombuffer(raw, dtype=dtype).astype(np.float32, copy=False)
+    return np.asarray(value, dtype=np.float32)
+
+def encode_vector(vector: Any, encoding: str = "json") -> EncodedVector:
+    """
+    Encode a vector returned by Qdrant for an MCP response
+
+    Args:
+        vector: Float list or numpy array
+        encoding: "json" returns the list unchanged, "float32"/"float16"
+            return base64 of the packed little-endian values
+
+    Returns:
+        Float list or base64 string
+    """
+    dtype = _dtype_for(encoding)
+    if dtype is None or vector is None:
+        return vector
+    return base64.b64encode(np.asarray(vector, dtype=dtype).tobytes()).decode("ascii")